@@ -1,7 +1,8 @@
 ﻿from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, raiseload, selectinload
 from decimal import Decimal
 import os
 import re
@@ -47,20 +48,29 @@ def _render_catalog_template(template: str, context: dict[str, object]) -> str:
 
 def _build_order_supply_info(db: Session, order: models.Order) -> list[str]:
     lines: list[str] = []
-    order_items = db.query(models.OrderItem).filter(models.OrderItem.order_id == order.id).all()
+    order_items = (
+        db.query(models.OrderItem)
+        .filter(models.OrderItem.order_id == order.id)
+        .options(
+            selectinload(models.OrderItem.variant).selectinload(models.ProductVariant.product),
+            selectinload(models.OrderItem.variant).selectinload(models.ProductVariant.size),
+            selectinload(models.OrderItem.variant).selectinload(models.ProductVariant.color),
+        )
+        .all()
+    )
     if not order_items:
         return ["• Нет товарных позиций"]
 
     for idx, item in enumerate(order_items, start=1):
-        variant = db.query(models.ProductVariant).get(item.variant_id) if item.variant_id else None
-        product = db.query(models.Product).get(variant.product_id) if variant else None
+        variant = item.variant if item.variant_id else None
+        product = variant.product if variant else None
         size_name = "—"
         color_name = "—"
         if variant and variant.size_id:
-            size = db.query(models.Size).get(variant.size_id)
+            size = variant.size
             size_name = (size.name if size else "—")
         if variant and variant.color_id:
-            color = db.query(models.Color).get(variant.color_id)
+            color = variant.color
             color_name = (color.name if color else "—")
         elif product and getattr(product, "detected_color", None):
             normalized = normalize_color_to_whitelist(getattr(product, "detected_color", None))
@@ -186,9 +196,25 @@ def admin_list_products(q: Optional[str] = Query(None), page: int = Query(1, ge=
     if q:
         query = query.filter(models.Product.title.ilike(f"%{q}%"))
 
-    total = query.count()
+    # total rides along on every row via COUNT(*) OVER (), so no separate count query
+    result = (
+        query.add_columns(func.count().over().label("total_count"))
+        .order_by(models.Product.created_at.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+        .options(
+            selectinload(models.Product.variants).selectinload(models.ProductVariant.color),
+            selectinload(models.Product.variants).selectinload(models.ProductVariant.size),
+            selectinload(models.Product.images),
+            # anything not loaded above is a lazy load per row; fail instead
+            raiseload("*"),
+        )
+        .all()
+    )
+    rows = [r[0] for r in result]
+    # an out-of-range page has no rows to carry the total
+    total = int(result[0].total_count) if result else query.count()
     pages = max(1, (total + per_page - 1) // per_page)
-    rows = query.order_by(models.Product.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
 
     items: List[AdminProductListItem] = []
     for p in rows:
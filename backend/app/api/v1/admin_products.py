@@ -2,10 +2,12 @@
 from typing import Optional, List
 from decimal import Decimal
 from pathlib import Path
+import itertools
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
 
 from app.api.dependencies import get_db, get_current_admin_user
 from app.db import models
@@ -138,36 +140,70 @@ def _parse_sizes(raw: Optional[str]) -> List[str]:
 
 
 def _get_or_create_size(db: Session, name: str) -> models.Size:
-    name = str(name).strip()[:64]
-    if not name:
-        raise ValueError("empty size")
-    s = db.query(models.Size).filter(models.Size.name == name).first()
-    if s:
-        return s
-    s = models.Size(name=name, slug=slugify(name)[:64] if slugify(name) else None)
-    db.add(s)
-    db.flush()
-    return s
+    return _get_or_create_sizes(db, [name])[0]
 
 
 def _get_or_create_color(db: Session, name: str) -> models.Color:
-    name = str(name).strip()[:128]
-    if not name:
+    return _get_or_create_colors(db, [name])[0]
+
+
+def _get_or_create_sizes(db: Session, names: List[str]) -> List[models.Size]:
+    """Sizes by name, created when missing: one IN lookup and one flush for the new ones."""
+    clean = [str(n).strip()[:64] for n in names]
+    if any(not n for n in clean):
+        raise ValueError("empty size")
+    if not clean:
+        return []
+    by_name: dict[str, models.Size] = {}
+    for s in db.query(models.Size).filter(models.Size.name.in_(set(clean))).order_by(models.Size.id):
+        by_name.setdefault(s.name, s)
+    missing = False
+    for name in clean:
+        if name not in by_name:
+            by_name[name] = models.Size(name=name, slug=slugify(name)[:64] if slugify(name) else None)
+            db.add(by_name[name])
+            missing = True
+    if missing:
+        db.flush()
+    return [by_name[name] for name in clean]
+
+
+def _get_or_create_colors(db: Session, names: List[str]) -> List[models.Color]:
+    """Colors by name (slug match first, then name), created when missing, with a single lookup query."""
+    clean = [str(n).strip()[:128] for n in names]
+    if any(not n for n in clean):
         raise ValueError("empty color")
-    # try by slug first for stability
-    slug = (slugify(name) or "")[:128]
-    q = db.query(models.Color)
-    c = None
-    if slug:
-        c = q.filter(models.Color.slug == slug).first()
-    if not c:
-        c = q.filter(models.Color.name == name).first()
-    if c:
-        return c
-    c = models.Color(name=name, slug=slug or None)
-    db.add(c)
-    db.flush()
-    return c
+    if not clean:
+        return []
+    slugs = {name: (slugify(name) or "")[:128] for name in clean}
+    rows = (
+        db.query(models.Color)
+        .filter(or_(models.Color.slug.in_({x for x in slugs.values() if x}), models.Color.name.in_(set(clean))))
+        .order_by(models.Color.id)
+        .all()
+    )
+    by_slug: dict[str, models.Color] = {}
+    by_name: dict[str, models.Color] = {}
+    for c in rows:
+        if c.slug:
+            by_slug.setdefault(c.slug, c)
+        by_name.setdefault(c.name, c)
+    out: List[models.Color] = []
+    missing = False
+    for name in clean:
+        slug = slugs[name]
+        c = (by_slug.get(slug) if slug else None) or by_name.get(name)
+        if c is None:
+            c = models.Color(name=name, slug=slug or None)
+            db.add(c)
+            missing = True
+            if slug:
+                by_slug[slug] = c
+            by_name[name] = c
+        out.append(c)
+    if missing:
+        db.flush()
+    return out
 
 
 @router.get("/products")
@@ -189,27 +225,38 @@ def list_products(
         .order_by(models.Product.created_at.desc())
         .offset((safe_page - 1) * int(limit))
         .limit(int(limit))
+        .options(
+            selectinload(models.Product.variants).selectinload(models.ProductVariant.color),
+            selectinload(models.Product.variants).selectinload(models.ProductVariant.size),
+            selectinload(models.Product.images),
+        )
         .all()
     )
+    # latest cost per variant for the whole page in one query
+    page_variant_ids = [int(v.id) for p in items for v in (p.variants or []) if getattr(v, "id", None)]
+    latest_cost_all: dict[int, float] = {}
+    if page_variant_ids:
+        rows = (
+            db.query(models.ProductCost)
+            .filter(models.ProductCost.variant_id.in_(page_variant_ids))
+            .order_by(models.ProductCost.variant_id.asc(), models.ProductCost.created_at.desc(), models.ProductCost.id.desc())
+            .all()
+        )
+        for r in rows:
+            vid = int(getattr(r, "variant_id", 0) or 0)
+            if vid <= 0 or vid in latest_cost_all:
+                continue
+            latest_cost_all[vid] = float(getattr(r, "cost_price", 0) or 0)
     out = []
     for p in items:
         sizes = []
         colors = []
         gallery_urls: set[str] = set()
-        variant_ids = [int(v.id) for v in (p.variants or []) if getattr(v, "id", None)]
-        latest_cost_by_variant: dict[int, float] = {}
-        if variant_ids:
-            rows = (
-                db.query(models.ProductCost)
-                .filter(models.ProductCost.variant_id.in_(variant_ids))
-                .order_by(models.ProductCost.variant_id.asc(), models.ProductCost.created_at.desc(), models.ProductCost.id.desc())
-                .all()
-            )
-            for r in rows:
-                vid = int(getattr(r, "variant_id", 0) or 0)
-                if vid <= 0 or vid in latest_cost_by_variant:
-                    continue
-                latest_cost_by_variant[vid] = float(getattr(r, "cost_price", 0) or 0)
+        latest_cost_by_variant = {
+            int(v.id): latest_cost_all[int(v.id)]
+            for v in (p.variants or [])
+            if getattr(v, "id", None) and int(v.id) in latest_cost_all
+        }
         try:
             sizes = sorted({(v.size.name if getattr(v, "size", None) else None) for v in (p.variants or []) if (getattr(v, "size", None) and v.size.name)})
             colors = sorted({(v.color.name if getattr(v, "color", None) else None) for v in (p.variants or []) if (getattr(v, "color", None) and v.color.name)})
@@ -352,8 +399,7 @@ def create_product(
     color_objs: List[models.Color] = []
     if color and str(color).strip():
         try:
-            for c_name in _parse_colors(str(color)):
-                color_objs.append(_get_or_create_color(db, c_name))
+            color_objs = _get_or_create_colors(db, _parse_colors(str(color)))
         except Exception as exc:
             raise HTTPException(400, detail=f"invalid color: {exc}")
 
@@ -374,23 +420,29 @@ def create_product(
             p.detected_color_debug = detected.get("debug")
             logger.info("create_product color-detect: product=%s color=%s confidence=%s photos=%s", p.id, canonical, detected.get("confidence"), len(local_sources))
 
-    if not size_list:
+    # resolve sizes first so the variants below are flushed as one batched INSERT
+    # (size lookups flush the session and would otherwise split it per size)
+    try:
+        size_objs = _get_or_create_sizes(db, size_list)
+    except Exception as exc:
+        raise HTTPException(400, detail=f"invalid size: {exc}")
+
+    new_variants: List[models.ProductVariant] = []
+    if not size_objs:
         if color_objs:
             for c_obj in color_objs:
-                db.add(models.ProductVariant(product_id=p.id, price=p.base_price, color_id=c_obj.id, stock_quantity=stock_value))
+                new_variants.append(models.ProductVariant(product_id=p.id, price=p.base_price, color_id=c_obj.id, stock_quantity=stock_value))
         else:
-            db.add(models.ProductVariant(product_id=p.id, price=p.base_price, color_id=None, stock_quantity=stock_value))
+            new_variants.append(models.ProductVariant(product_id=p.id, price=p.base_price, color_id=None, stock_quantity=stock_value))
     else:
-        for sz in size_list:
-            try:
-                s_obj = _get_or_create_size(db, sz)
-            except Exception as exc:
-                raise HTTPException(400, detail=f"invalid size: {exc}")
+        for s_obj in size_objs:
             if color_objs:
                 for c_obj in color_objs:
-                    db.add(models.ProductVariant(product_id=p.id, price=p.base_price, size_id=s_obj.id, color_id=c_obj.id, stock_quantity=stock_value))
+                    new_variants.append(models.ProductVariant(product_id=p.id, price=p.base_price, size_id=s_obj.id, color_id=c_obj.id, stock_quantity=stock_value))
             else:
-                db.add(models.ProductVariant(product_id=p.id, price=p.base_price, size_id=s_obj.id, color_id=None, stock_quantity=stock_value))
+                new_variants.append(models.ProductVariant(product_id=p.id, price=p.base_price, size_id=s_obj.id, color_id=None, stock_quantity=stock_value))
+    db.add_all(new_variants)
+    db.flush()
 
     if cost_value is not None and cost_value >= 0:
         for v in (p.variants or []):
@@ -434,7 +486,7 @@ def update_product(
     db: Session = Depends(get_db),
     admin: models.User = Depends(get_current_admin_user),
 ):
-    p = db.query(models.Product).get(product_id)
+    p = db.get(models.Product, product_id)
     if not p:
         raise HTTPException(404, detail="not found")
 
@@ -521,8 +573,7 @@ def update_product(
         size_list = _parse_sizes(sizes) if sizes is not None else []
         color_objs: List[models.Color] = []
         if color is not None and str(color).strip():
-            for c_name in _parse_colors(str(color)):
-                color_objs.append(_get_or_create_color(db, c_name))
+            color_objs = _get_or_create_colors(db, _parse_colors(str(color)))
 
         if p.variants is None:
             p.variants = []
@@ -532,26 +583,18 @@ def update_product(
         for v in p.variants:
             existing_by_pair[(int(v.size_id) if v.size_id else None, int(v.color_id) if v.color_id else None)] = v
 
+        new_variants: List[models.ProductVariant] = []
         if size_list:
-            for sz in size_list:
-                s_obj = _get_or_create_size(db, sz)
-                if color_objs:
-                    for c_obj in color_objs:
-                        key = (int(s_obj.id), int(c_obj.id))
-                        v = existing_by_pair.get(key)
-                        if v:
-                            v.price = p.base_price
-                            db.add(v)
-                        else:
-                            db.add(models.ProductVariant(product_id=p.id, price=p.base_price, size_id=s_obj.id, color_id=c_obj.id, stock_quantity=stock_value))
+            size_ids = [int(s_obj.id) for s_obj in _get_or_create_sizes(db, size_list)]
+            color_ids: List[int | None] = [int(c_obj.id) for c_obj in color_objs] or [None]
+            for key in itertools.product(size_ids, color_ids):
+                v = existing_by_pair.get(key)
+                if v:
+                    v.price = p.base_price
+                    db.add(v)
                 else:
-                    key = (int(s_obj.id), None)
-                    v = existing_by_pair.get(key)
-                    if v:
-                        v.price = p.base_price
-                        db.add(v)
-                    else:
-                        db.add(models.ProductVariant(product_id=p.id, price=p.base_price, size_id=s_obj.id, color_id=None, stock_quantity=stock_value))
+                    new_variants.append(models.ProductVariant(product_id=p.id, price=p.base_price, size_id=key[0], color_id=key[1], stock_quantity=stock_value))
+            db.add_all(new_variants)
         else:
             # no size list supplied: at least update first variant color/price
             if p.variants:
@@ -598,7 +641,7 @@ def update_product(
 
 @router.delete("/products/{product_id}")
 def delete_product(product_id: int, db: Session = Depends(get_db), admin: models.User = Depends(get_current_admin_user)):
-    p = db.query(models.Product).get(product_id)
+    p = db.get(models.Product, product_id)
     if not p:
         return {"ok": True}
     db.delete(p)
@@ -628,7 +671,7 @@ def create_category(
 
 @router.delete("/categories/{category_id}")
 def delete_category(category_id: int, db: Session = Depends(get_db), admin: models.User = Depends(get_current_admin_user)):
-    c = db.query(models.Category).get(category_id)
+    c = db.get(models.Category, category_id)
     if not c:
         return {"ok": True}
     db.delete(c)
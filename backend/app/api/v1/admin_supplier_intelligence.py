@@ -12,6 +12,7 @@ from celery.result import AsyncResult
 
 from app.tasks.celery_app import celery_app
 from pydantic import BaseModel, Field
+from sqlalchemy import case, func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
@@ -35,9 +36,10 @@ from app.services.supplier_intelligence import (
     ensure_min_markup_price,
     estimate_market_price,
     avito_market_scan,
+    clear_image_lookup_caches,
     dominant_color_name_from_url,
     detect_source_kind,
-    extract_catalog_items,
+    extract_catalog_items_parallel,
     extract_image_urls_from_html_page,
     fetch_tabular_preview,
     generate_youth_description,
@@ -51,6 +53,7 @@ from app.services.supplier_intelligence import (
     normalize_retail_price,
     search_image_urls_by_title,
     _extract_size_stock_map as extract_size_stock_map,
+    _batch_signature_hamming as batch_signature_hamming,
 )
 
 router = APIRouter(tags=["admin_supplier_intelligence"])
@@ -76,6 +79,39 @@ COLOR_COMBO_SECONDARY_RATIO = float(os.getenv("COLOR_COMBO_SECONDARY_RATIO", "0.
 FOOTWEAR_TITLE_RE = re.compile(
     r"(?i)\b(new\s*balance|nb\s*\d|nike|adidas|jordan|yeezy|air\s*max|vomero|samba|gazelle|campus|9060|574|1906|2002|dunk|forum|asics)\b"
 )
+COLOR_TOKEN_SPLIT_RE = re.compile(r"[,;/|]+|\s{2,}|\s+-\s+")
+
+# checked in order: a message mentioning both a timeout and a parse step is a network error
+IMPORT_ERROR_CODE_PATTERNS: tuple[tuple[re.Pattern[str], str], ...] = (
+    (re.compile(r"timeout|timed out|connection|429|too many requests", re.I), ERROR_CODE_NETWORK_TIMEOUT),
+    (re.compile(r"not an image|invalid image", re.I), ERROR_CODE_INVALID_IMAGE),
+    (re.compile(r"parse", re.I), ERROR_CODE_PARSE_FAILED),
+)
+
+SHOP_VKUS_COLOR_ALIASES: dict[str, str] = {
+    "чёрный": "черный",
+    "black": "черный",
+    "white": "белый",
+    "grey": "серый",
+    "gray": "серый",
+    "red": "красный",
+    "blue": "синий",
+    "green": "зеленый",
+    "beige": "бежевый",
+    "brown": "коричневый",
+    "pink": "розовый",
+    "purple": "фиолетовый",
+    "yellow": "желтый",
+    "orange": "оранжевый",
+}
+
+SHOP_VKUS_COLOR_PALETTE: tuple[str, ...] = (
+    "черный", "чёрный", "белый", "серый", "красный", "синий", "голубой", "зеленый", "зелёный",
+    "бежевый", "коричневый", "розовый", "фиолетовый", "желтый", "оранжевый",
+    "black", "white", "grey", "gray", "red", "blue", "green", "beige", "brown", "pink", "purple", "yellow", "orange",
+)
+
+SHOP_VKUS_IGNORED_COLOR_KEYS: frozenset[str] = frozenset({"мульти"})
 
 
 def _looks_like_direct_image_url(url: str | None) -> bool:
@@ -88,7 +124,7 @@ def _looks_like_direct_image_url(url: str | None) -> bool:
 
 
 def _normalize_error_message(exc: Exception) -> str:
-    message = " ".join(str(exc).strip().split())
+    message = " ".join(str(exc).split())
     if len(message) > ERROR_MESSAGE_MAX_LEN:
         return f"{message[:ERROR_MESSAGE_MAX_LEN - 3]}..."
     return message
@@ -99,7 +135,7 @@ def _split_color_tokens(raw: str | None) -> list[str]:
     if not txt:
         return []
     out: list[str] = []
-    for part in re.split(r"[,;/|]+|\s{2,}|\s+-\s+", txt):
+    for part in COLOR_TOKEN_SPLIT_RE.split(txt):
         token = " ".join(part.strip().split())
         if token and token not in out:
             out.append(token)
@@ -314,34 +350,12 @@ def _shop_vkus_row_post_link(item: dict[str, object], image_urls: list[str] | No
 
 
 def _extract_shop_vkus_color_tokens(item: dict, image_urls: list[str] | None = None) -> list[str]:
-    color_aliases = {
-        "чёрный": "черный",
-        "black": "черный",
-        "white": "белый",
-        "grey": "серый",
-        "gray": "серый",
-        "red": "красный",
-        "blue": "синий",
-        "green": "зеленый",
-        "beige": "бежевый",
-        "brown": "коричневый",
-        "pink": "розовый",
-        "purple": "фиолетовый",
-        "yellow": "желтый",
-        "orange": "оранжевый",
-    }
-
     def _canon_color(name: str | None) -> str:
         key = str(name or "").strip().lower()
         if not key:
             return ""
-        return str(color_aliases.get(key) or key)
+        return str(SHOP_VKUS_COLOR_ALIASES.get(key) or key)
 
-    palette = (
-        "черный", "чёрный", "белый", "серый", "красный", "синий", "голубой", "зеленый", "зелёный",
-        "бежевый", "коричневый", "розовый", "фиолетовый", "желтый", "оранжевый",
-        "black", "white", "grey", "gray", "red", "blue", "green", "beige", "brown", "pink", "purple", "yellow", "orange",
-    )
     blob_parts: list[str] = []
     for key in ("color", "title", "description", "text", "notes"):
         v = item.get(key)
@@ -349,7 +363,7 @@ def _extract_shop_vkus_color_tokens(item: dict, image_urls: list[str] | None = N
             blob_parts.append(v)
     blob = " ".join(blob_parts).lower()
     found: list[str] = []
-    for c in palette:
+    for c in SHOP_VKUS_COLOR_PALETTE:
         if re.search(rf"(?<!\w){re.escape(c)}(?!\w)", blob):
             cc = _canon_color(c)
             if cc and cc not in found:
@@ -373,7 +387,7 @@ def _extract_shop_vkus_color_tokens(item: dict, image_urls: list[str] | None = N
         except Exception:
             nm = None
         key = _canon_color(nm)
-        if not key or key in {"мульти"}:
+        if not key or key in SHOP_VKUS_IGNORED_COLOR_KEYS:
             continue
         analyzed.append((sig, key))
 
@@ -945,13 +959,10 @@ def _has_online_celery_workers() -> bool:
 def _classify_import_error(exc: Exception) -> str:
     if isinstance(exc, IntegrityError):
         return ERROR_CODE_DB_CONFLICT
-    message = str(exc).lower()
-    if any(token in message for token in ("timeout", "timed out", "connection", "429", "too many requests")):
-        return ERROR_CODE_NETWORK_TIMEOUT
-    if "not an image" in message or "invalid image" in message:
-        return ERROR_CODE_INVALID_IMAGE
-    if "parse" in message:
-        return ERROR_CODE_PARSE_FAILED
+    message = str(exc)
+    for pattern, code in IMPORT_ERROR_CODE_PATTERNS:
+        if pattern.search(message):
+            return code
     return ERROR_CODE_UNKNOWN
 
 
@@ -1354,7 +1365,8 @@ def _register_source_error(report: ImportSourceReport, exc: Exception, context:
     report.errors += 1
     report.last_error_message = message
     report.error_codes[code] = int(report.error_codes.get(code) or 0) + 1
-    if message and message not in report.error_samples and len(report.error_samples) < ERROR_SAMPLES_LIMIT:
+    # keep the first unique samples; once full, skip the membership scan entirely
+    if message and len(report.error_samples) < ERROR_SAMPLES_LIMIT and message not in report.error_samples:
         report.error_samples.append(message)
 
 
@@ -1558,6 +1570,8 @@ def import_products_from_sources(
     _admin=Depends(get_current_admin_user),
     db: Session = Depends(get_db),
 ):
+    # image signatures/colors are memoized per url for this run only
+    clear_image_lookup_caches()
     source_ids = [int(x) for x in payload.source_ids]
     sources = (
         db.query(models.SupplierSource)
@@ -1752,9 +1766,11 @@ def import_products_from_sources(
             return None
         if sig in signature_product_map:
             return db.query(models.Product).filter(models.Product.id == signature_product_map[sig]).one_or_none()
-        # fuzzy match for same print with minor image differences
-        for known_sig, pid in signature_product_map.items():
-            dist = print_signature_hamming(sig, known_sig)
+        # fuzzy match for same print with minor image differences;
+        # the map grows with every imported product, so score it in one batch
+        known = list(signature_product_map.items())
+        dists = batch_signature_hamming(sig, [known_sig for known_sig, _ in known])
+        for (_, pid), dist in zip(known, dists):
             if dist is not None and dist <= 6:
                 return db.query(models.Product).filter(models.Product.id == pid).one_or_none()
         return None
@@ -1850,7 +1866,7 @@ def import_products_from_sources(
             if hasattr(importer, "_fetch_preview_fn"):
                 importer._fetch_preview_fn = fetch_tabular_preview
             if hasattr(importer, "_extract_items_fn"):
-                importer._extract_items_fn = extract_catalog_items
+                importer._extract_items_fn = extract_catalog_items_parallel
             ctx = ImporterContext(
                 source_url=src_url,
                 supplier_name=getattr(src, "supplier_name", None),
@@ -2906,7 +2922,40 @@ def import_quality_audit(
     db: Session = Depends(get_db),
 ):
     sample_limit = max(1, min(int(sample_limit or 60), 300))
-    products = db.query(models.Product).filter(models.Product.visible == True).all()  # noqa: E712
+
+    # one aggregated row per visible product instead of lazy-loading images/variants/sizes per product
+    image_count = (
+        db.query(func.count(models.ProductImage.id))
+        .filter(models.ProductImage.product_id == models.Product.id)
+        .correlate(models.Product)
+        .scalar_subquery()
+    )
+    variant_flags = (
+        db.query(
+            models.ProductVariant.product_id.label("product_id"),
+            func.max(case((func.trim(func.coalesce(models.Size.name, "")) != "", 1), else_=0)).label("has_size"),
+            func.max(case((func.coalesce(models.ProductVariant.stock_quantity, 0) > 0, 1), else_=0)).label("has_stock"),
+        )
+        .outerjoin(models.Size, models.Size.id == models.ProductVariant.size_id)
+        .group_by(models.ProductVariant.product_id)
+        .subquery()
+    )
+    products = (
+        db.query(
+            models.Product.id,
+            models.Product.title,
+            models.Product.category_id,
+            models.Product.import_supplier_name,
+            models.Product.default_image,
+            image_count.label("image_count"),
+            func.coalesce(variant_flags.c.has_size, 0).label("has_size"),
+            func.coalesce(variant_flags.c.has_stock, 0).label("has_stock"),
+        )
+        .outerjoin(variant_flags, variant_flags.c.product_id == models.Product.id)
+        .filter(models.Product.visible == True)  # noqa: E712
+        .order_by(models.Product.id)
+        .all()
+    )
 
     one_photo = 0
     no_size = 0
@@ -2914,47 +2963,36 @@ def import_quality_audit(
     no_stock = 0
     samples: list[ImportQualityAuditItem] = []
 
-    title_buckets: dict[tuple[int | None, str], list[models.Product]] = {}
+    title_buckets: dict[tuple[int | None, str], list[int]] = {}
     for p in products:
-        key = (getattr(p, "category_id", None), re.sub(r"\s+", " ", str(getattr(p, "title", "") or "").strip().lower()))
-        title_buckets.setdefault(key, []).append(p)
+        key = (p.category_id, re.sub(r"\s+", " ", str(p.title or "").strip().lower()))
+        title_buckets.setdefault(key, []).append(int(p.id))
 
     duplicate_ids: set[int] = set()
     for bucket in title_buckets.values():
         if len(bucket) > 1:
             duplicate_title += len(bucket)
-            for p in bucket:
-                if getattr(p, "id", None):
-                    duplicate_ids.add(int(p.id))
+            duplicate_ids.update(bucket)
+
+    def _sample(p, issue: str) -> None:
+        if len(samples) < sample_limit:
+            samples.append(ImportQualityAuditItem(product_id=int(p.id), title=str(p.title or ""), category_id=p.category_id, supplier=p.import_supplier_name, issue=issue))
 
     for p in products:
-        pid = int(getattr(p, "id", 0) or 0)
-        if pid <= 0:
+        if int(p.id or 0) <= 0:
             continue
-        imgs = list(getattr(p, "images", []) or [])
-        image_count = len(imgs)
-        if not image_count and getattr(p, "default_image", None):
-            image_count = 1
-        if image_count <= 1:
+        photos = int(p.image_count or 0) or (1 if p.default_image else 0)
+        if photos <= 1:
             one_photo += 1
-            if len(samples) < sample_limit:
-                samples.append(ImportQualityAuditItem(product_id=pid, title=str(getattr(p, "title", "") or ""), category_id=getattr(p, "category_id", None), supplier=getattr(p, "import_supplier_name", None), issue="one_photo"))
-
-        variants = list(getattr(p, "variants", []) or [])
-        size_names = [str(getattr(getattr(v, "size", None), "name", "") or "").strip() for v in variants]
-        if not any(size_names):
+            _sample(p, "one_photo")
+        if not p.has_size:
             no_size += 1
-            if len(samples) < sample_limit:
-                samples.append(ImportQualityAuditItem(product_id=pid, title=str(getattr(p, "title", "") or ""), category_id=getattr(p, "category_id", None), supplier=getattr(p, "import_supplier_name", None), issue="no_size"))
-
-        has_stock = any(int(getattr(v, "stock_quantity", 0) or 0) > 0 for v in variants)
-        if not has_stock:
+            _sample(p, "no_size")
+        if not p.has_stock:
             no_stock += 1
-            if len(samples) < sample_limit:
-                samples.append(ImportQualityAuditItem(product_id=pid, title=str(getattr(p, "title", "") or ""), category_id=getattr(p, "category_id", None), supplier=getattr(p, "import_supplier_name", None), issue="no_stock"))
-
-        if pid in duplicate_ids and len(samples) < sample_limit:
-            samples.append(ImportQualityAuditItem(product_id=pid, title=str(getattr(p, "title", "") or ""), category_id=getattr(p, "category_id", None), supplier=getattr(p, "import_supplier_name", None), issue="duplicate_title"))
+            _sample(p, "no_stock")
+        if int(p.id) in duplicate_ids:
+            _sample(p, "duplicate_title")
 
     return ImportQualityAuditOut(
         total_visible=len(products),
@@ -1,6 +1,7 @@
 from typing import Optional, Dict, Any, List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body
 from fastapi import Path, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from decimal import Decimal
@@ -10,7 +11,8 @@ from app.db import models
 from app.services import media_store
 from app.services.color_detection import normalize_color_to_whitelist, canonical_color_to_display_name
 
-router = APIRouter(prefix="/products", tags=["products"])
+# storefront list/detail payloads are large nested dicts; orjson encodes them in C
+router = APIRouter(prefix="/products", tags=["products"], default_response_class=ORJSONResponse)
 
 
 def _images_overlap_ratio(a: list[str], b: list[str]) -> float:
@@ -53,6 +55,8 @@ def _build_color_payload(p: models.Product) -> Dict[str, Any]:
         _append_unique(base_gallery, base_seen, list(getattr(v, "images", None) or []))
 
     color_groups: Dict[str, Dict[str, Any]] = {}
+    # per-group seen sets live beside the groups so each merge doesn't rebuild one from the list
+    group_seen: Dict[str, set[str]] = {}
     for v in variants:
         raw_name = (v.color.name if getattr(v, "color", None) and v.color and v.color.name else None) or ""
         color_key = normalize_color_to_whitelist(raw_name)
@@ -60,7 +64,7 @@ def _build_color_payload(p: models.Product) -> Dict[str, Any]:
             continue
         grp = color_groups.setdefault(color_key, {"color": color_key, "variant_ids": [], "images": []})
         grp["variant_ids"].append(v.id)
-        _append_unique(grp["images"], set(grp["images"]), list(v.images or []))
+        _append_unique(grp["images"], group_seen.setdefault(color_key, set()), list(v.images or []))
 
     if isinstance(stored_images_by_key, dict):
         for k, imgs in stored_images_by_key.items():
@@ -68,7 +72,7 @@ def _build_color_payload(p: models.Product) -> Dict[str, Any]:
             if not key:
                 continue
             grp = color_groups.setdefault(key, {"color": key, "variant_ids": [], "images": []})
-            _append_unique(grp["images"], set(grp["images"]), list(imgs or []))
+            _append_unique(grp["images"], group_seen.setdefault(key, set()), list(imgs or []))
 
     for grp in color_groups.values():
         if not grp["images"] and general_images:
@@ -14,12 +14,22 @@ POOL_SIZE = int(os.getenv("SQLALCHEMY_POOL_SIZE", "10"))
 MAX_OVERFLOW = int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", "20"))
 POOL_PRE_PING = True
 
+
+def insertmanyvalues_page_size() -> int:
+    # rows per batched INSERT when the ORM/Core flushes many rows at once;
+    # shared with the maintenance scripts' engines (scripts/_db.py)
+    return int(os.getenv("SQLALCHEMY_INSERTMANYVALUES_PAGE_SIZE", "1000"))
+
+
+INSERTMANYVALUES_PAGE_SIZE = insertmanyvalues_page_size()
+
 # If you want to disable pooling for some envs, you can use NullPool
 engine = create_engine(
     DATABASE_URL,
     pool_size=POOL_SIZE,
     max_overflow=MAX_OVERFLOW,
     pool_pre_ping=POOL_PRE_PING,
+    insertmanyvalues_page_size=INSERTMANYVALUES_PAGE_SIZE,
     future=True,
 )
 
@@ -7,14 +7,22 @@ import logging
 import os
 import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import requests
-from PIL import Image
+from PIL import Image, ImageChops
 
 logger = logging.getLogger("color_detection")
 
+DETECT_MAX_WORKERS = 8
+# side of the square the subject pixels are sampled from
+ANALYSIS_SIZE = 220
+# margin cut from each side of that square before sampling (~24% of ANALYSIS_SIZE)
+SUBJECT_CROP_MARGIN_PX = 52
+
 
 _COLOR_ALIASES: Dict[str, str] = {
     "grey": "gray",
@@ -58,10 +66,19 @@ _COLOR_PRIORITY: tuple[str, ...] = (
     "black", "white", "gray", "beige", "brown", "blue", "navy", "sky_blue", "green", "olive", "lime",
     "yellow", "orange", "red", "burgundy", "pink", "purple", "lavender", "khaki", "cream", "silver", "gold", "multi",
 )
+_COLOR_ORDER: Dict[str, int] = {c: i for i, c in enumerate(_COLOR_PRIORITY)}
+
+# brackets become spaces and "ё" folds to "е" in one translate pass
+_COLOR_KEY_TRANSLATION = str.maketrans({**{ch: " " for ch in "()[]{}"}, "ё": "е"})
+
 
+def _allowed_combo_pairs() -> frozenset[tuple[str, str]]:
+    # cache keyed on the raw env value, so a changed COLOR_ALLOWED_PAIRS is still honored
+    return _parse_allowed_combo_pairs(os.getenv("COLOR_ALLOWED_PAIRS", "black-white"))
 
-def _allowed_combo_pairs() -> set[tuple[str, str]]:
-    raw = os.getenv("COLOR_ALLOWED_PAIRS", "black-white")
+
+@lru_cache(maxsize=8)
+def _parse_allowed_combo_pairs(raw: str) -> frozenset[tuple[str, str]]:
     out: set[tuple[str, str]] = set()
     for token in str(raw or "").split(","):
         parts = [normalize_color_key(x) for x in re.split(r"[-/|;]+", token.strip()) if normalize_color_key(x)]
@@ -73,17 +90,14 @@ def _allowed_combo_pairs() -> set[tuple[str, str]]:
         out.add(tuple(sorted((a, b))))
     if not out:
         out.add(("black", "white"))
-    return out
+    return frozenset(out)
 
 
 def normalize_color_key(raw: Optional[str]) -> str:
     txt = str(raw or "").strip().lower()
     if not txt:
         return ""
-    txt = txt.replace("ё", "е")
-    txt = re.sub(r"[()\[\]{}]", " ", txt)
-    txt = re.sub(r"\s+", " ", txt).strip().replace(" ", "_")
-    txt = re.sub(r"_single$", "", txt)
+    txt = "_".join(txt.translate(_COLOR_KEY_TRANSLATION).split()).removesuffix("_single")
     txt = _COLOR_ALIASES.get(txt, txt)
     return txt if txt in CANONICAL_COLORS else ""
 
@@ -98,8 +112,7 @@ def normalize_combo_color_key(keys: Sequence[str]) -> str:
     if not normalized:
         return ""
 
-    order = {c: i for i, c in enumerate(_COLOR_PRIORITY)}
-    normalized.sort(key=lambda x: order.get(x, 999))
+    normalized.sort(key=lambda x: _COLOR_ORDER.get(x, 999))
     primary = normalized[0]
     if len(normalized) == 1:
         return primary
@@ -121,8 +134,7 @@ def normalize_palette_color_key(keys: Sequence[str], max_colors: int = 3) -> str
     if not normalized:
         return ""
 
-    order = {c: i for i, c in enumerate(_COLOR_PRIORITY)}
-    normalized.sort(key=lambda x: order.get(x, 999))
+    normalized.sort(key=lambda x: _COLOR_ORDER.get(x, 999))
     max_colors = max(1, min(int(max_colors or 1), 3))
     normalized = normalized[:max_colors]
 
@@ -145,6 +157,8 @@ class ImageColorResult:
     debug: Dict[str, Any]
 
 
+# product photos repeat a lot of exact RGB values (flat uppers, backgrounds)
+@lru_cache(maxsize=16384)
 def _rgb_to_lab(rgb: Tuple[int, int, int]) -> Tuple[float, float, float]:
     def _pivot_rgb(v: float) -> float:
         v = v / 255.0
@@ -167,7 +181,10 @@ def _rgb_to_lab(rgb: Tuple[int, int, int]) -> Tuple[float, float, float]:
     return (l, a, b2)
 
 
-def _download_or_open(source: str, timeout_sec: int = 12) -> Optional[Image.Image]:
+def _download_or_open(source: Union[str, Image.Image], timeout_sec: int = 12) -> Optional[Image.Image]:
+    if isinstance(source, Image.Image):
+        # already decoded (e.g. an upload still in memory); skip the encode/decode round-trip
+        return source if source.mode == "RGB" else source.convert("RGB")
     if not source:
         return None
     try:
@@ -180,28 +197,55 @@ def _download_or_open(source: str, timeout_sec: int = 12) -> Optional[Image.Imag
         return None
 
 
+_DROP, _KEEP, _KEEP_IF_WARM = 0, 1, 2
+
+
+def _subject_pixel_rule(mx: int, mn: int) -> int:
+    # s/v exactly as colorsys.rgb_to_hsv computes them for this max/min channel pair
+    maxc = mx / 255.0
+    v = maxc
+    s = (maxc - mn / 255.0) / maxc if maxc else 0.0
+    if v > 0.95 and s < 0.10:
+        return _DROP
+    if v < 0.03:
+        return _DROP
+    # keep more saturated/contrasty pixels, but allow warm neutrals and dark neutral product zones
+    if s < 0.06 and v > 0.25:
+        return _KEEP_IF_WARM
+    return _KEEP
+
+
+@lru_cache(maxsize=1)
+def _subject_pixel_rules() -> bytes:
+    # the background filter depends on a pixel only through (max, min) channel, so tabulate it once
+    return bytes(_subject_pixel_rule(mx, mn) if mn <= mx else _DROP for mx in range(256) for mn in range(256))
+
+
 def _extract_subject_pixels(img: Image.Image) -> List[Tuple[int, int, int]]:
     w, h = img.size
     if w < 8 or h < 8:
         return []
-    img = img.resize((220, 220))
-    px = img.load()
-
-    x0, x1 = 52, 168
-    y0, y1 = 52, 168
+    # reducing_gap box-reduces large photos first, then resamples the small remainder
+    img = img.resize((ANALYSIS_SIZE, ANALYSIS_SIZE), reducing_gap=3.0)
+
+    margin = SUBJECT_CROP_MARGIN_PX
+    x0, x1 = margin, ANALYSIS_SIZE - margin
+    y0, y1 = margin, ANALYSIS_SIZE - margin
+    box = img.crop((x0, y0, x1, y1))
+    r_band, g_band, b_band = box.split()
+    hi = ImageChops.lighter(ImageChops.lighter(r_band, g_band), b_band).tobytes()
+    lo = ImageChops.darker(ImageChops.darker(r_band, g_band), b_band).tobytes()
+    rs, gs, bs = r_band.tobytes(), g_band.tobytes(), b_band.tobytes()
+    rules = _subject_pixel_rules()
+    width = x1 - x0
     pixels: List[Tuple[int, int, int]] = []
-    for y in range(y0, y1, 2):
-        for x in range(x0, x1, 2):
-            r, g, b = px[x, y]
-            h1, s, v = colorsys.rgb_to_hsv(r / 255.0, g / 255.0, b / 255.0)
-            if v > 0.95 and s < 0.10:
-                continue
-            if v < 0.03:
-                continue
-            # keep more saturated/contrasty pixels, but allow warm neutrals and dark neutral product zones
-            if s < 0.06 and v > 0.25 and not (r > g >= b and (r - b) > 8):
-                continue
-            pixels.append((r, g, b))
+    # sample every other row and column of the centre window
+    for start in range(0, (y1 - y0) * width, 2 * width):
+        row = slice(start, start + width, 2)
+        for r, g, b, mx, mn in zip(rs[row], gs[row], bs[row], hi[row], lo[row]):
+            rule = rules[(mx << 8) | mn]
+            if rule == _KEEP or (rule == _KEEP_IF_WARM and r > g >= b and (r - b) > 8):
+                pixels.append((r, g, b))
     return pixels
 
 
@@ -215,11 +259,19 @@ def _kmeans(points: Sequence[Tuple[float, float, float]], k: int = 3, max_iter:
     step = max(1, len(uniq) // k)
     centers = [tuple(map(float, uniq[i * step])) for i in range(k)]
 
+    def _nearest(p: Tuple[float, float, float]) -> int:
+        # first center wins on ties, same as min(range(k), key=...)
+        best_i, best_d = 0, math.inf
+        for i, (cx, cy, cz) in enumerate(centers):
+            d = (p[0] - cx) ** 2 + (p[1] - cy) ** 2 + (p[2] - cz) ** 2
+            if d < best_d:
+                best_i, best_d = i, d
+        return best_i
+
     for _ in range(max_iter):
         groups: List[List[Tuple[float, float, float]]] = [[] for _ in range(k)]
         for p in points:
-            idx = min(range(k), key=lambda i: (p[0] - centers[i][0]) ** 2 + (p[1] - centers[i][1]) ** 2 + (p[2] - centers[i][2]) ** 2)
-            groups[idx].append(p)
+            groups[_nearest(p)].append(p)
         new_centers = []
         for i, g in enumerate(groups):
             if not g:
@@ -232,11 +284,10 @@ def _kmeans(points: Sequence[Tuple[float, float, float]], k: int = 3, max_iter:
             break
         centers = new_centers
 
-    out = []
-    for i in range(k):
-        count = sum(1 for p in points if min(range(k), key=lambda j: (p[0] - centers[j][0]) ** 2 + (p[1] - centers[j][1]) ** 2 + (p[2] - centers[j][2]) ** 2) == i)
-        if count > 0:
-            out.append({"center": centers[i], "count": count})
+    counts = [0] * k
+    for p in points:
+        counts[_nearest(p)] += 1
+    out = [{"center": centers[i], "count": counts[i]} for i in range(k) if counts[i] > 0]
     out.sort(key=lambda x: x["count"], reverse=True)
     return out
 
@@ -296,7 +347,21 @@ def canonical_color_from_lab_hsv(l: float, a: float, b: float, h: float, s: floa
     return "gray"
 
 
-def detect_color_from_image_source(source: str, timeout_sec: int = 12) -> Optional[ImageColorResult]:
+def _nearest_pixel(
+    pixels: Sequence[Tuple[int, int, int]],
+    lab_points: Sequence[Tuple[float, float, float]],
+    center: Tuple[float, float, float],
+) -> Tuple[int, int, int]:
+    # lab_points[i] is _rgb_to_lab(pixels[i]); reuse it instead of converting again
+    l, a, b = center
+    _, rgb = min(
+        zip(lab_points, pixels),
+        key=lambda lp: (lp[0][0] - l) ** 2 + (lp[0][1] - a) ** 2 + (lp[0][2] - b) ** 2,
+    )
+    return rgb
+
+
+def detect_color_from_image_source(source: Union[str, Image.Image], timeout_sec: int = 12) -> Optional[ImageColorResult]:
     img = _download_or_open(source, timeout_sec=timeout_sec)
     if img is None:
         return None
@@ -314,7 +379,7 @@ def detect_color_from_image_source(source: str, timeout_sec: int = 12) -> Option
     l, a, b = main["center"]
 
     # HSV from Lab center approximation via nearest original pixel
-    rr2, gg2, bb2 = min(pixels, key=lambda p: ( _rgb_to_lab(p)[0] - l) ** 2 + (_rgb_to_lab(p)[1] - a) ** 2 + (_rgb_to_lab(p)[2] - b) ** 2)
+    rr2, gg2, bb2 = _nearest_pixel(pixels, lab_points, (l, a, b))
     h, s, v = colorsys.rgb_to_hsv(rr2 / 255.0, gg2 / 255.0, bb2 / 255.0)
 
     color = canonical_color_from_lab_hsv(l, a, b, h, s, v)
@@ -325,7 +390,7 @@ def detect_color_from_image_source(source: str, timeout_sec: int = 12) -> Option
     if color == "blue" and len(clusters) > 1:
         for cl in clusters[1:]:
             l2, a2, b2 = cl["center"]
-            rr3, gg3, bb3 = min(pixels, key=lambda p: (_rgb_to_lab(p)[0] - l2) ** 2 + (_rgb_to_lab(p)[1] - a2) ** 2 + (_rgb_to_lab(p)[2] - b2) ** 2)
+            rr3, gg3, bb3 = _nearest_pixel(pixels, lab_points, (l2, a2, b2))
             _h2, s2, v2 = colorsys.rgb_to_hsv(rr3 / 255.0, gg3 / 255.0, bb3 / 255.0)
             neutral_like = s2 < 0.16 and (v2 < 0.30 or l2 < 40)
             if neutral_like and float(cl.get("count") or 0) / float(total) >= 0.25:
@@ -337,7 +402,7 @@ def detect_color_from_image_source(source: str, timeout_sec: int = 12) -> Option
         second = clusters[1]
         second_share = float(second["count"]) / float(total)
         l2, a2, b2 = second["center"]
-        rr3, gg3, bb3 = min(pixels, key=lambda p: (_rgb_to_lab(p)[0] - l2) ** 2 + (_rgb_to_lab(p)[1] - a2) ** 2 + (_rgb_to_lab(p)[2] - b2) ** 2)
+        rr3, gg3, bb3 = _nearest_pixel(pixels, lab_points, (l2, a2, b2))
         h2, s2, v2 = colorsys.rgb_to_hsv(rr3 / 255.0, gg3 / 255.0, bb3 / 255.0)
         c2 = canonical_color_from_lab_hsv(l2, a2, b2, h2, s2, v2)
         # NOTE: never return generic "multi" at per-image level; keep primary color,
@@ -397,13 +462,25 @@ def _compose_palette_color(top: List[tuple[str, float]], total_score: float, tar
     return normalize_palette_color_key(chosen[:target_count], max_colors=target_count)
 
 
-def detect_product_color(image_sources: Sequence[str], supplier_profile: Optional[str] = None) -> Dict[str, Any]:
+def detect_product_color(
+    image_sources: Sequence[str],
+    supplier_profile: Optional[str] = None,
+    *,
+    precomputed: Optional[Sequence[Optional[ImageColorResult]]] = None,
+) -> Dict[str, Any]:
     valid = [str(x).strip() for x in (image_sources or []) if str(x or "").strip()]
-    votes: List[ImageColorResult] = []
-    for src in valid:
-        res = detect_color_from_image_source(src)
-        if res:
-            votes.append(res)
+    if precomputed is not None:
+        # per-photo results the caller already has, in source order
+        results = list(precomputed)
+        if len(results) != len(image_sources or []):
+            raise ValueError(f"precomputed has {len(results)} results for {len(image_sources or [])} image sources")
+    elif len(valid) > 1 and any(src.lower().startswith(("http://", "https://")) for src in valid):
+        # downloads dominate for remote photos; fetch them side by side (map keeps order)
+        with ThreadPoolExecutor(max_workers=min(DETECT_MAX_WORKERS, len(valid))) as pool:
+            results = list(pool.map(detect_color_from_image_source, valid))
+    else:
+        results = [detect_color_from_image_source(src) for src in valid]
+    votes: List[ImageColorResult] = [res for res in results if res]
 
     if not votes:
         return {"color": "none", "confidence": 0.0, "debug": {"reason": "no_votes"}, "per_image": []}
@@ -559,7 +636,12 @@ def detect_product_color(image_sources: Sequence[str], supplier_profile: Optiona
 
 
 def normalize_color_to_whitelist(name: Optional[str]) -> str:
-    raw = str(name or "").strip().lower()
+    # key the cache on the cleaned string so any input type stays hashable
+    return _normalize_color_to_whitelist(str(name or "").strip().lower())
+
+
+@lru_cache(maxsize=1024)
+def _normalize_color_to_whitelist(raw: str) -> str:
     if not raw:
         return ""
     if re.search(r"[-/|,;]", raw):
@@ -569,7 +651,11 @@ def normalize_color_to_whitelist(name: Optional[str]) -> str:
 
 
 def canonical_color_to_display_name(name: Optional[str]) -> str:
-    canonical = normalize_color_to_whitelist(name)
+    return _canonical_color_to_display_name(normalize_color_to_whitelist(name))
+
+
+@lru_cache(maxsize=1024)
+def _canonical_color_to_display_name(canonical: str) -> str:
     if not canonical:
         return ""
     if "-" in canonical:
@@ -39,11 +39,22 @@ PRICE_CURRENCY_RE = re.compile(
 PRICE_KEYWORDS_RE = re.compile(r'(?:цена|продажа|стоимость)[:\s\-]*([0-9\s,.\u00A0]+)', flags=re.IGNORECASE)
 COST_KEYWORDS_RE = re.compile(r'(?:закуп|себест|себестоимость|cost)[:\s\-]*([0-9\s,.\u00A0]+)', flags=re.IGNORECASE)
 SIZE_RE = re.compile(r'размер(?:ы)?[:\s]*([^\n#]+)', flags=re.IGNORECASE)
+# a size line often runs on into the next field ("Размеры: 42, 43 цвет: черный")
+SIZE_FIELD_STOP_RE = re.compile(r'\b(?:цвет(?:а|ов)?|цена|наличие|остаток|склад|арт(?:икул)?|код)\b', flags=re.IGNORECASE)
+SIZE_QTY_SUFFIX_RE = re.compile(r"\((?:\s*\d+\s*(?:шт|pcs|pc)?\s*)\)", flags=re.IGNORECASE)
+SIZE_QTY_PAIR_RE = re.compile(r"(?<!\d)(\d{2,3}(?:[.,]5)?)\s*\(\s*(\d{1,4})\s*(?:шт|pcs|pc)?\s*\)", flags=re.IGNORECASE)
+LIST_SEPARATOR_RE = re.compile(r'[;,/\\\n]')
+WHITESPACE_RE = re.compile(r'\s+')
 COLOR_RE = re.compile(r'цвет(?:а|ов)?[:\s]*([A-Za-zА-Яа-яЁё0-9,#\s\-]+)', flags=re.IGNORECASE)
 HASHTAG_RE = re.compile(r'#([\w\-А-Яа-яёЁ]+)', flags=re.UNICODE)
 STOCK_RE = re.compile(r'(?:остаток|в\s*наличии|наличие|stock|склад|qty|кол-?во|количество)[:\s\-]*([0-9]{1,5})', flags=re.IGNORECASE)
 RRC_KEYWORDS_RE = re.compile(r'(?:ррц|rrc|мрц|mrc|розниц(?:а|ная)?\s*цена|retail)[:\s\-]*([0-9][0-9\s,.\u00A0]*)', flags=re.IGNORECASE)
 URL_RE = re.compile(r'https?://[^\s<>"\']+', flags=re.IGNORECASE)
+IMAGE_CANDIDATE_SPLIT_RE = re.compile(r"[\n\r\t,;|\s]+")
+IMAGE_EXT_RE = re.compile(r"\.(?:jpe?g|png|webp|gif|avif)(?:[?#].*)?$")
+THUMB_PARAM_RE = re.compile(r"(?:^|[?&])(w|width|h|height|q|quality|size|name)=")
+HTML_IMAGE_ATTR_RE = re.compile(r'(?:src|data-src|href|content)\s*=\s*["\']([^"\']+)["\']', flags=re.IGNORECASE)
+HTML_IMAGE_LITERAL_RE = re.compile(r'["\'](https?://[^"\']+\.(?:jpg|jpeg|png|webp|avif|gif)(?:\?[^"\']*)?)["\']', flags=re.IGNORECASE)
 
 IMPORT_FALLBACK_STOCK_QTY = 9_999
 RRC_DISCOUNT_RUB = Decimal("300")
@@ -189,7 +200,7 @@ def _extract_sizes(text: Optional[str]) -> List[str]:
         chunk = (m.group(1) or "").strip()
         if not chunk:
             continue
-        chunk = re.split(r'\b(?:цвет(?:а|ов)?|цена|наличие|остаток|склад|арт(?:икул)?|код)\b', chunk, maxsplit=1, flags=re.IGNORECASE)[0].strip(" ,.;:-")
+        chunk = SIZE_FIELD_STOP_RE.split(chunk, maxsplit=1)[0].strip(" ,.;:-")
         if not chunk:
             continue
 
@@ -198,14 +209,14 @@ def _extract_sizes(text: Optional[str]) -> List[str]:
             found.extend(list(inline_size_stock_map.keys()))
             continue
 
-        cleaned_chunk = re.sub(r"\((?:\s*\d+\s*(?:шт|pcs|pc)?\s*)\)", "", chunk, flags=re.IGNORECASE)
+        cleaned_chunk = SIZE_QTY_SUFFIX_RE.sub("", chunk)
         tokens = split_size_tokens(cleaned_chunk)
         if tokens:
             found.extend(tokens)
             continue
-        parts = re.split(r'[;,/\\\n]', cleaned_chunk)
+        parts = LIST_SEPARATOR_RE.split(cleaned_chunk)
         for p in parts:
-            token = re.sub(r'\s+', ' ', p).strip()
+            token = WHITESPACE_RE.sub(' ', p).strip()
             if token:
                 found.append(token)
     out: List[str] = []
@@ -229,7 +240,7 @@ def _extract_size_stock_map(text: Optional[str]) -> Dict[str, int]:
     # Conservative fallback for patterns like "41(0шт), 42(1шт)".
     # Keep this strict to avoid treating price lines as size-stock rows.
     out: Dict[str, int] = {}
-    for m in re.finditer(r"(?<!\d)(\d{2,3}(?:[.,]5)?)\s*\(\s*(\d{1,4})\s*(?:шт|pcs|pc)?\s*\)", text, flags=re.IGNORECASE):
+    for m in SIZE_QTY_PAIR_RE.finditer(text):
         size = str(m.group(1) or "").replace(",", ".").strip()
         qty_raw = str(m.group(2) or "").strip()
         if not size or not qty_raw:
@@ -247,7 +258,7 @@ def _extract_colors(text: Optional[str]) -> List[str]:
         return []
     m = COLOR_RE.search(text)
     if m:
-        parts = re.split(r'[;,/\\\n]', m.group(1))
+        parts = LIST_SEPARATOR_RE.split(m.group(1))
         return [p.strip() for p in parts if p.strip()]
     tags = HASHTAG_RE.findall(text or "")
     return tags
@@ -329,10 +340,10 @@ def _split_image_candidates(raw: Any) -> List[str]:
     value = str(raw or "").strip()
     if not value:
         return []
-    parts = [p.strip() for p in re.split(r"[\n\r\t,;|\s]+", value) if p and p.strip()]
+    parts = [p.strip() for p in IMAGE_CANDIDATE_SPLIT_RE.split(value) if p and p.strip()]
     if len(parts) <= 1:
         return [value]
-    return [p for p in parts if re.match(r"(?i)^https?://", p) or p.startswith("/")]
+    return [p for p in parts if p.lower().startswith(("http://", "https://", "/"))]
 
 
 def _looks_like_thumbnail(url: str) -> bool:
@@ -341,12 +352,12 @@ def _looks_like_thumbnail(url: str) -> bool:
         return False
     if any(x in u for x in ("thumb", "thumbnail", "preview", "_small", "/small/")):
         return True
-    return bool(re.search(r"(?:^|[?&])(w|width|h|height|q|quality|size|name)=", u))
+    return bool(THUMB_PARAM_RE.search(u))
 
 
 def _is_probable_image_url(url: str) -> bool:
     u = str(url or "").lower()
-    return bool(re.search(r"\.(?:jpe?g|png|webp|gif|avif)(?:[?#].*)?$", u))
+    return bool(IMAGE_EXT_RE.search(u))
 
 
 def _strip_gallery_single_param(url: str) -> str:
@@ -379,7 +390,7 @@ def _upgrade_image_url_quality(url: str) -> str:
 
 def _extract_images_from_html(base_url: str, html: str) -> List[str]:
     urls: List[str] = []
-    for m in re.finditer(r'(?:src|data-src|href|content)\s*=\s*["\']([^"\']+)["\']', html, flags=re.IGNORECASE):
+    for m in HTML_IMAGE_ATTR_RE.finditer(html):
         cand = (m.group(1) or "").strip()
         if not cand:
             continue
@@ -388,16 +399,10 @@ def _extract_images_from_html(base_url: str, html: str) -> List[str]:
         cand = urljoin(base_url, cand)
         if _is_probable_image_url(cand):
             urls.append(cand)
-    for m in re.finditer(r'["\'](https?://[^"\']+\.(?:jpg|jpeg|png|webp|avif|gif)(?:\?[^"\']*)?)["\']', html, flags=re.IGNORECASE):
+    for m in HTML_IMAGE_LITERAL_RE.finditer(html):
         urls.append((m.group(1) or "").strip())
-    out: List[str] = []
-    seen = set()
-    for u in urls:
-        uq = _upgrade_image_url_quality(u)
-        if uq and uq not in seen:
-            seen.add(uq)
-            out.append(uq)
-    return out
+    # both passes usually hit the same urls: dedup before the (urlparse) quality upgrade and after it
+    return [u for u in dict.fromkeys(_upgrade_image_url_quality(u) for u in dict.fromkeys(urls)) if u]
 
 
 def _expand_gallery_url_to_images(url: str) -> List[str]:
@@ -495,15 +500,12 @@ def _normalize_image_urls(payload: Dict[str, Any]) -> List[str]:
         else:
             expanded_urls.append(_upgrade_image_url_quality(cu))
 
-    seen = set()
     out: List[str] = []
     thumbs: List[str] = []
-    for u in expanded_urls:
+    # dict.fromkeys dedups in first-seen order
+    for u in dict.fromkeys(expanded_urls):
         if not u:
             continue
-        if u in seen:
-            continue
-        seen.add(u)
         if _looks_like_thumbnail(u):
             thumbs.append(u)
         else:
@@ -61,6 +61,22 @@ def _validate_remote_image_quality(data: bytes) -> None:
             pass
 
 
+def _read_response_capped(resp: requests.Response, limit: int) -> bytes:
+    """Read a streamed response body, bailing out as soon as it exceeds `limit`."""
+    try:
+        declared = int(resp.headers.get("content-length") or 0)
+    except (TypeError, ValueError):
+        declared = 0
+    if declared > limit:
+        raise ValueError("remote image too large")
+    buf = bytearray()
+    for chunk in resp.iter_content(64 * 1024):
+        buf.extend(chunk)
+        if len(buf) > limit:
+            raise ValueError("remote image too large")
+    return bytes(buf)
+
+
 def _ensure_folder(folder: str) -> Path:
     p = UPLOAD_BASE.joinpath(folder)
     p.mkdir(parents=True, exist_ok=True)
@@ -160,17 +176,27 @@ def save_remote_image_to_local(
     if not u.lower().startswith(("http://", "https://")):
         raise ValueError("unsupported remote image url")
 
+    # already stored under this url hash: skip the download entirely
+    dest_folder = _ensure_folder(folder)
+    url_hash = hashlib.sha1(u.encode("utf-8")).hexdigest()[:16]
+    for existing in dest_folder.glob(f"*_{url_hash}.*"):
+        if existing.is_file():
+            return public_url_from_path(existing)
+
     headers = {"User-Agent": "defshop-media-fetch/1.0"}
     if referer:
         headers["Referer"] = str(referer).strip()
 
     try:
-        resp = requests.get(u, timeout=timeout_sec, headers=headers)
+        resp = requests.get(u, timeout=timeout_sec, headers=headers, stream=True)
         resp.raise_for_status()
     except Exception as exc:
         raise ValueError(f"failed to download image: {exc}")
 
-    data = resp.content or b""
+    try:
+        data = _read_response_capped(resp, MAX_UPLOAD_BYTES)
+    finally:
+        resp.close()
     ctype = (resp.headers.get("content-type") or "").split(";")[0].strip().lower()
 
     ext_map = {
@@ -197,18 +223,9 @@ def save_remote_image_to_local(
 
     if len(data) == 0:
         raise ValueError("empty image payload")
-    if len(data) > MAX_UPLOAD_BYTES:
-        raise ValueError("remote image too large")
 
     _validate_remote_image_quality(data)
 
-    dest_folder = _ensure_folder(folder)
-
-    url_hash = hashlib.sha1(u.encode("utf-8")).hexdigest()[:16]
-    for existing in dest_folder.glob(f"*_{url_hash}.*"):
-        if existing.is_file():
-            return public_url_from_path(existing)
-
     stem = _filename_stem_hint(filename_hint)
     if not stem:
         parsed_name = os.path.basename(urlparse(u).path).rsplit(".", 1)[0]
@@ -2,29 +2,70 @@ from __future__ import annotations
 
 import colorsys
 import csv
+import heapq
+import http.cookiejar
 import io
 import json
+import multiprocessing
 import os
 import random
 import re
 import statistics
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from html.parser import HTMLParser
 from typing import Any, Iterable, Optional
 from urllib.parse import parse_qs, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.services.color_detection import detect_product_color, normalize_color_to_whitelist
 
 
+@lru_cache(maxsize=256)
+def _keywords_re(candidates: tuple[str, ...]) -> re.Pattern[str]:
+    # one alternation scans the text once instead of one `in` per keyword
+    return re.compile("|".join(re.escape(c) for c in candidates))
+
+
 def _safe_timeout(timeout_sec: int | float) -> tuple[float, float]:
     t = max(1.0, float(timeout_sec or 20))
     # split connect/read timeout to fail fast on bad endpoints
     return (min(5.0, t), max(1.0, t))
 
 
+def _build_http_session() -> requests.Session:
+    # shared keep-alive pool: supplier imports and avito scans hit the same
+    # few hosts, so reusing TCP/TLS connections saves a handshake per request
+    session = requests.Session()
+    # the session is shared across threads and hosts: never store cookies, so one
+    # site's anti-bot/rate-limit cookies don't ride along on later requests
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    # no retries inside the pool: _http_get_with_retries is the only retry
+    # layer, so a dead host costs exactly max_attempts connection attempts
+    retry = Retry(total=0, read=False)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=32, pool_maxsize=64)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_HTTP_SESSION = _build_http_session()
+_MAX_RETRY_AFTER_SEC = 10.0
+
+
+def _retry_delay(resp: Any, attempt: int, backoff_sec: float) -> float:
+    # honour a numeric Retry-After on rate limits instead of guessing
+    raw = str((getattr(resp, "headers", None) or {}).get("Retry-After") or "").strip()
+    if raw.isdigit():
+        return min(float(raw), _MAX_RETRY_AFTER_SEC)
+    return backoff_sec * attempt
+
+
 def _http_get_with_retries(
     url: str,
     *,
@@ -32,16 +73,24 @@ def _http_get_with_retries(
     headers: dict[str, str] | None = None,
     max_attempts: int = 3,
     backoff_sec: float = 0.35,
+    stream: bool = False,
 ) -> requests.Response:
     last_exc: Exception | None = None
     for attempt in range(1, max(1, int(max_attempts)) + 1):
         try:
-            resp = requests.get(url, timeout=_safe_timeout(timeout_sec), headers=headers)
+            resp = _HTTP_SESSION.get(url, timeout=_safe_timeout(timeout_sec), headers=headers, stream=stream)
             # retry on transient server/rate-limit responses
             if resp.status_code in {429, 500, 502, 503, 504} and attempt < max_attempts:
-                time.sleep(backoff_sec * attempt)
+                if stream:
+                    resp.close()
+                time.sleep(_retry_delay(resp, attempt, backoff_sec))
                 continue
-            resp.raise_for_status()
+            try:
+                resp.raise_for_status()
+            except Exception:
+                if stream:
+                    resp.close()
+                raise
             return resp
         except Exception as exc:
             last_exc = exc
@@ -53,14 +102,26 @@ def _http_get_with_retries(
 
 def _download_image_bytes(url: str, timeout_sec: int = 20, max_bytes: int = 6_000_000) -> bytes:
     headers = {"User-Agent": "defshop-intel-bot/1.0"}
-    r = _http_get_with_retries(url, timeout_sec=timeout_sec, headers=headers, max_attempts=3)
-    content_type = (r.headers.get("content-type") or "").lower()
-    if content_type and "image" not in content_type:
-        raise RuntimeError("url is not an image resource")
-    data = r.content or b""
-    if len(data) > int(max_bytes):
-        raise RuntimeError("image is too large for analysis")
-    return data
+    # stream the body: non-images and oversized files are rejected from the
+    # headers (or the first chunks past the cap) without buffering everything
+    r = _http_get_with_retries(url, timeout_sec=timeout_sec, headers=headers, max_attempts=3, stream=True)
+    try:
+        content_type = (r.headers.get("content-type") or "").lower()
+        if content_type and "image" not in content_type:
+            raise RuntimeError("url is not an image resource")
+        declared = str(r.headers.get("content-length") or "").strip()
+        if declared.isdigit() and int(declared) > int(max_bytes):
+            raise RuntimeError("image is too large for analysis")
+        buf = bytearray()
+        for chunk in r.iter_content(chunk_size=64 * 1024):
+            buf.extend(chunk)
+            if len(buf) > int(max_bytes):
+                raise RuntimeError("image is too large for analysis")
+        return bytes(buf)
+    finally:
+        close = getattr(r, "close", None)
+        if callable(close):
+            close()
 
 
 CATEGORY_RULES: dict[str, tuple[str, ...]] = {
@@ -90,8 +151,14 @@ ACCESSORY_KEYWORDS: tuple[str, ...] = (
     "ремень", "кепк", "шапк", "сумк", "кошелек", "шарф", "перчат", "очки",
 )
 
+_FOOTWEAR_KEYWORDS_RE = _keywords_re(FOOTWEAR_KEYWORDS)
+_ACCESSORY_KEYWORDS_RE = _keywords_re(ACCESSORY_KEYWORDS)
+_CATEGORY_RULE_RES: tuple[tuple[str, re.Pattern[str]], ...] = tuple(
+    (cat, _keywords_re(keywords)) for cat, keywords in CATEGORY_RULES.items()
+)
+
 
-@dataclass
+@dataclass(slots=True)
 class SupplierOffer:
     supplier: str
     title: str
@@ -141,7 +208,12 @@ class _SimpleTableParser(HTMLParser):
 
 
 def detect_source_kind(url: str) -> str:
-    u = (url or "").lower()
+    return _classify_source_url((url or "").lower())
+
+
+@lru_cache(maxsize=1024)
+def _classify_source_url(u: str) -> str:
+    # import loops classify the same handful of source urls over and over
     if "docs.google.com/spreadsheets" in u:
         return "google_sheet"
     if "moysklad" in u:
@@ -173,27 +245,54 @@ def _normalize_google_sheet_csv(url: str) -> str:
 
 
 
+# utf-8 cyrillic (U+0400..U+047F) read as latin-1: "Ð"/"Ñ" + one continuation char
+_MOJIBAKE_PAIRS: dict[str, str] = {
+    chr(cp).encode("utf-8").decode("latin-1"): chr(cp) for cp in range(0x0400, 0x0480)
+}
+_MOJIBAKE_PAIR_RE = re.compile("|".join(re.escape(k) for k in _MOJIBAKE_PAIRS))
+
+
+def _mojibake_pair_repl(m: re.Match[str]) -> str:
+    return _MOJIBAKE_PAIRS[m.group(0)]
+
+
 def _fix_common_mojibake(value: str) -> str:
     s = str(value or "")
     if not s:
         return s
     if "Ð" in s or "Ñ" in s:
+        # mixed text (clean cyrillic next to mojibake) can't round-trip as a
+        # whole; repair the damaged pairs in one table-driven pass instead
+        if max(s) > "\xff":
+            return _MOJIBAKE_PAIR_RE.sub(_mojibake_pair_repl, s)
         try:
             repaired = s.encode("latin-1").decode("utf-8")
             if repaired.count("�") <= s.count("�"):
                 return repaired
-        except Exception:
-            return s
+        except UnicodeDecodeError:
+            return _MOJIBAKE_PAIR_RE.sub(_mojibake_pair_repl, s)
     return s
 
 def _response_text(resp: requests.Response) -> str:
-    if not resp.content:
+    content = resp.content
+    if not content:
         return ""
-    for enc in [resp.encoding, getattr(resp, "apparent_encoding", None), "utf-8", "cp1251", "latin-1"]:
+    if resp.encoding:
+        try:
+            return content.decode(resp.encoding, errors="replace")
+        except Exception:
+            pass
+    # strict utf-8 trial is cheap; charset detection (apparent_encoding) scans
+    # the whole payload, so only run it when utf-8 does not fit
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    for enc in (getattr(resp, "apparent_encoding", None), "cp1251", "latin-1"):
         if not enc:
             continue
         try:
-            return resp.content.decode(enc, errors="replace")
+            return content.decode(enc, errors="replace")
         except Exception:
             continue
     return resp.text
@@ -230,17 +329,18 @@ def fetch_tabular_preview(url: str, timeout_sec: int = 20, max_rows: int = 25) -
     }
 
 
+@lru_cache(maxsize=8192)
 def map_category(raw_title: str) -> str:
     t = (raw_title or "").strip().lower()
     if not t:
         return "Одежда"
     # critical rule: footwear must never fall into accessories
-    if any(k in t for k in FOOTWEAR_KEYWORDS):
+    if _FOOTWEAR_KEYWORDS_RE.search(t):
         return "Обувь"
-    if any(k in t for k in ACCESSORY_KEYWORDS):
+    if _ACCESSORY_KEYWORDS_RE.search(t):
         return "Аксессуары"
-    for cat, keywords in CATEGORY_RULES.items():
-        if any(k in t for k in keywords):
+    for cat, pattern in _CATEGORY_RULE_RES:
+        if pattern.search(t):
             return cat
     return "Одежда"
 
@@ -271,8 +371,7 @@ def estimate_market_price(values: Iterable[float]) -> Optional[float]:
     if len(arr) < 4:
         return round(float(statistics.median(arr)), 2)
 
-    q1 = statistics.quantiles(arr, n=4, method="inclusive")[0]
-    q3 = statistics.quantiles(arr, n=4, method="inclusive")[2]
+    q1, _, q3 = statistics.quantiles(arr, n=4, method="inclusive")
     iqr = q3 - q1
     low = q1 - 1.5 * iqr
     high = q3 + 1.5 * iqr
@@ -283,42 +382,44 @@ def estimate_market_price(values: Iterable[float]) -> Optional[float]:
     return round(float(statistics.median(trimmed)), 2)
 
 
-def pick_best_offer(
+def rank_offers(
     offers: list[SupplierOffer],
     desired_color: str | None = None,
     desired_size: str | None = None,
-) -> SupplierOffer | None:
+    *,
+    limit: int | None = None,
+) -> list[SupplierOffer]:
+    """Order offers best-first: exact color/size match, then in stock, then the rest; cheapest first within each."""
     if not offers:
-        return None
+        return []
 
     color = (desired_color or "").strip().lower()
     size = (desired_size or "").strip().lower()
 
-    def score(o: SupplierOffer) -> tuple[int, int, float]:
-        color_ok = (not color) or ((o.color or "").strip().lower() == color)
-        size_ok = (not size) or ((o.size or "").strip().lower() == size)
-        stock = o.stock if isinstance(o.stock, int) else 0
-        # better score => lower tuple
-        return (
-            0 if color_ok else 1,
-            0 if size_ok else 1,
-            float(o.dropship_price),
-        )
+    # score columns are built once per batch; ranking then only compares tuples
+    keys: list[tuple[int, float, int, int]] = []
+    for o in offers:
+        color_miss = 0 if (not color or (o.color or "").strip().lower() == color) else 1
+        size_miss = 0 if (not size or (o.size or "").strip().lower() == size) else 1
+        tier = 0 if not (color_miss or size_miss) else (1 if (o.stock or 0) > 0 else 2)
+        keys.append((tier, float(o.dropship_price), color_miss, size_miss))
+
+    order = range(len(offers))
+    if limit is None:
+        idx = sorted(order, key=keys.__getitem__)
+    else:
+        idx = heapq.nsmallest(max(0, int(limit)), order, key=keys.__getitem__)
+    return [offers[i] for i in idx]
+
 
-    sorted_offers = sorted(offers, key=score)
+def pick_best_offer(
+    offers: list[SupplierOffer],
+    desired_color: str | None = None,
+    desired_size: str | None = None,
+) -> SupplierOffer | None:
     # if exact color/size required and nothing matches, fallback to cheapest available
-    exact = [
-        o
-        for o in sorted_offers
-        if (not color or (o.color or "").strip().lower() == color)
-        and (not size or (o.size or "").strip().lower() == size)
-    ]
-    if exact:
-        return min(exact, key=lambda x: float(x.dropship_price))
-    in_stock = [o for o in sorted_offers if (o.stock or 0) > 0]
-    if in_stock:
-        return min(in_stock, key=lambda x: float(x.dropship_price))
-    return min(sorted_offers, key=lambda x: float(x.dropship_price))
+    best = rank_offers(offers, desired_color, desired_size, limit=1)
+    return best[0] if best else None
 
 
 def _norm(s: Any) -> str:
@@ -527,6 +628,11 @@ def _extract_size_stock_map(raw: Any) -> dict[str, int]:
     return out
 
 
+_HTTP_SCHEME_RE = re.compile(r"^https?://", re.I)
+_IMAGE_URL_RE = re.compile(r'((?:https?:)?//[^\s,;|)\]>\'"]+)', re.I)
+_IMAGE_CELL_SPLIT_RE = re.compile(r"[\s,;|]+")
+
+
 def _normalize_image_candidate(url: str) -> str | None:
     u = str(url or "").strip().strip("\"\'()[]{}<>")
     if not u:
@@ -535,7 +641,7 @@ def _normalize_image_candidate(url: str) -> str | None:
         u = "https:" + u
     elif u.lower().startswith("www."):
         u = "https://" + u
-    if not re.match(r"^https?://", u, flags=re.I):
+    if not _HTTP_SCHEME_RE.match(u):
         return None
     return u
 
@@ -544,31 +650,36 @@ def _split_image_urls(raw: Any) -> list[str]:
     txt = _norm(raw)
     if not txt:
         return []
+    return list(_split_image_urls_cached(txt))
 
-    out: list[str] = []
+
+@lru_cache(maxsize=4096)
+def _split_image_urls_cached(txt: str) -> tuple[str, ...]:
+    # extract_catalog_items probes the same cells several times per row
+    # (image columns, row fallback, stock/sidecar checks), so parse each once
+    out: dict[str, None] = {}
 
     # collect explicit urls first (handles markdown/text with punctuation)
-    for m in re.findall(r'((?:https?:)?//[^\s,;|)\]>\'"]+)', txt, flags=re.I):
+    for m in _IMAGE_URL_RE.findall(txt):
         u = _normalize_image_candidate(m)
-        if u and u not in out:
-            out.append(u)
+        if u:
+            out[u] = None
 
     # fallback tokenization for plain cells
-    for chunk in re.split(r"[\s,;|]+", txt):
+    for chunk in _IMAGE_CELL_SPLIT_RE.split(txt):
         u = _normalize_image_candidate(chunk)
-        if u and u not in out:
-            out.append(u)
+        if u:
+            out[u] = None
 
-    return out
+    return tuple(out)
 
 
 def _row_fallback_images(row: list[str]) -> list[str]:
-    out: list[str] = []
+    out: dict[str, None] = {}
     for cell in row:
         for u in _split_image_urls(cell):
-            if u not in out:
-                out.append(u)
-    return out
+            out[u] = None
+    return list(out)
 
 
 def _extract_size_from_title(title: str) -> str | None:
@@ -646,20 +757,33 @@ def _extract_size_from_row_text(row: list[str]) -> str | None:
     return None
 
 
+_SIZE_LABEL_WORD_RE = re.compile(r"(?i)\b(?:РАЗМЕРЫ?|SIZE|SIZES?)\b")
+_DECIMAL_COMMA_RE = re.compile(r"(?<=\d),(?=\d)")
+_WHOLE_SIZE_RE = re.compile(r"\d{2,3}(?:\.0)?")
+_HALF_SIZE_RE = re.compile(r"\d{2,3}\.5")
+_NUMERIC_SIZE_RE = re.compile(r"\d{2,3}(?:\.5)?")
+_SIZE_RANGE_RE = re.compile(r"\b(\d{2,3})\s*-\s*(\d{2,3})\b")
+_SIZE_CHUNK_SPLIT_RE = re.compile(r"[\s,;|/]+")
+_BARE_SIZE_RANGE_RE = re.compile(r"^[0-9]{2,3}-[0-9]{2,3}$")
+_SIZE_TOKEN_JUNK_RE = re.compile(r"[^A-Z0-9+.,-]")
+_SIZE_LABEL_RE = re.compile(r"^(XXS|XS|S|M|L|XL|XXL|XXXL|\d{2,3}(?:[\.,]5)?)$")
+_EMBEDDED_SIZE_LABEL_RE = re.compile(r"(?<![\d.,])(XXS|XS|S|M|L|XL|XXL|XXXL|\d{2,3}(?:[\.,]5)?)(?![\d.,])")
+
+
 def split_size_tokens(raw: Any) -> list[str]:
     txt = _norm(raw).upper()
     if not txt:
         return []
-    txt = re.sub(r"(?i)\b(?:РАЗМЕРЫ?|SIZE|SIZES?)\b", " ", txt)
+    txt = _SIZE_LABEL_WORD_RE.sub(" ", txt)
     txt = txt.replace("–", "-").replace("—", "-").replace("−", "-")
-    txt = re.sub(r"(?<=\d),(?=\d)", ".", txt)
+    txt = _DECIMAL_COMMA_RE.sub(".", txt)
     out: list[str] = []
 
     def _canon_num(token: str) -> str:
         t = str(token or "").strip().replace(",", ".")
-        if re.fullmatch(r"\d{2,3}(?:\.0)?", t):
+        if _WHOLE_SIZE_RE.fullmatch(t):
             return str(int(float(t)))
-        if re.fullmatch(r"\d{2,3}\.5", t):
+        if _HALF_SIZE_RE.fullmatch(t):
             return t
         return ""
 
@@ -673,7 +797,7 @@ def split_size_tokens(raw: Any) -> list[str]:
             out.append(final)
 
     # numeric ranges in any textual form, e.g. "41-45", "41–45"
-    for a, b in re.findall(r"\b(\d{2,3})\s*-\s*(\d{2,3})\b", txt):
+    for a, b in _SIZE_RANGE_RE.findall(txt):
         try:
             aa = int(a)
             bb = int(b)
@@ -683,29 +807,29 @@ def split_size_tokens(raw: Any) -> list[str]:
             for size_num in range(aa, bb + 1):
                 _push(str(size_num))
 
-    for chunk in re.split(r"[\s,;|/]+", txt):
+    for chunk in _SIZE_CHUNK_SPLIT_RE.split(txt):
         token = chunk.strip().strip(".")
         if not token:
             continue
 
-        if "-" in token and re.match(r"^[0-9]{2,3}-[0-9]{2,3}$", token):
+        if "-" in token and _BARE_SIZE_RANGE_RE.match(token):
             continue
 
-        cleaned = re.sub(r"[^A-Z0-9+.,-]", "", token)
+        cleaned = _SIZE_TOKEN_JUNK_RE.sub("", token)
         if not cleaned:
             continue
-        if re.match(r"^(XXS|XS|S|M|L|XL|XXL|XXXL|\d{2,3}(?:[\.,]5)?)$", cleaned):
+        if _SIZE_LABEL_RE.match(cleaned):
             _push(cleaned)
 
     # fallback parser for formats like "46(S)-✅ 48(M)-✅ 50(L)-✅"
-    for token in re.findall(r"(?<![\d.,])(XXS|XS|S|M|L|XL|XXL|XXXL|\d{2,3}(?:[\.,]5)?)(?![\d.,])", txt):
+    for token in _EMBEDDED_SIZE_LABEL_RE.findall(txt):
         _push(token)
 
     # If supplier row contains paired numeric + letter labels (e.g. 46(S)),
     # keep numeric sizes to avoid duplicate variants like 46 and S.
-    numeric_count = sum(1 for x in out if re.fullmatch(r"\d{2,3}(?:\.5)?", x))
+    numeric_count = sum(1 for x in out if _NUMERIC_SIZE_RE.fullmatch(x))
     if numeric_count >= 2:
-        out = [x for x in out if re.fullmatch(r"\d{2,3}(?:\.5)?", x)]
+        out = [x for x in out if _NUMERIC_SIZE_RE.fullmatch(x)]
 
     return out
 
@@ -820,18 +944,18 @@ def _extract_color_from_title(title: str) -> tuple[str, str | None]:
     return (cleaned or raw), color
 
 def _find_col(headers: list[str], candidates: tuple[str, ...]) -> int | None:
-    h = [x.strip().lower() for x in headers]
-    for i, col in enumerate(h):
-        if any(c in col for c in candidates):
+    pattern = _keywords_re(candidates)
+    for i, col in enumerate(headers):
+        if pattern.search(col.strip().lower()):
             return i
     return None
 
 
 def _find_cols(headers: list[str], candidates: tuple[str, ...]) -> list[int]:
-    h = [x.strip().lower() for x in headers]
+    pattern = _keywords_re(candidates)
     out: list[int] = []
-    for i, col in enumerate(h):
-        if any(c in col for c in candidates):
+    for i, col in enumerate(headers):
+        if pattern.search(col.strip().lower()):
             out.append(i)
     return out
 
@@ -847,19 +971,23 @@ def _find_col_priority(headers: list[str], groups: tuple[tuple[str, ...], ...])
 
 
 
+_NON_PURCHASE_PRICE_HEADER_RE = _keywords_re(("ррц", "rrc", "мрц", "mrc", "розниц", "retail", "market"))
+_DROPSHIP_HEADER_RE = _keywords_re(("дроп", "dropship", "drop ship", "drop"))
+_PURCHASE_PRICE_HEADER_RE = _keywords_re(("опт", "wholesale", "price", "цена", "стоим"))
+
+
 def _is_non_purchase_price_header(header: str) -> bool:
     h = (header or "").strip().lower()
     if not h:
         return False
-    blocked_tokens = ("ррц", "rrc", "мрц", "mrc", "розниц", "retail", "market")
-    return any(token in h for token in blocked_tokens)
+    return bool(_NON_PURCHASE_PRICE_HEADER_RE.search(h))
 
 def _pick_price_column(headers: list[str]) -> int | None:
     normalized = [str(x or "").strip().lower() for x in headers]
 
     # 1) explicit dropship column always wins
     for i, col in enumerate(normalized):
-        if any(token in col for token in ("дроп", "dropship", "drop ship", "drop")):
+        if _DROPSHIP_HEADER_RE.search(col):
             return i
 
     # 2) fallback to generic purchase-like price columns, but skip RRC/MRC/retail
@@ -870,67 +998,127 @@ def _pick_price_column(headers: list[str]) -> int | None:
     for i, col in enumerate(normalized):
         if _is_non_purchase_price_header(col):
             continue
-        if any(token in col for token in ("опт", "wholesale", "price", "цена", "стоим")):
+        if _PURCHASE_PRICE_HEADER_RE.search(col):
             return i
     return None
 
-def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[dict[str, Any]]:
-    if not rows:
-        return []
+_SIDECAR_LABEL_RE = re.compile(r"(?i)(ссылка\s*на\s*фото|фото|photo\s*link|замер|measure)")
+_HEADER_KEYWORD_RE = re.compile(r"(?i)(товар|назв|price|цена|размер|size|налич|stock|цвет|color|фото|image)")
+_FOOTWEAR_BRAND_RE = re.compile(
+    r"(?i)\b(new\s*balance|nb\s*\d|nike|adidas|jordan|yeezy|air\s*max|vomero|samba|gazelle|campus|574|9060|1906|2002)\b"
+)
+_SIZE_NUMBER_RE = re.compile(r"(?<!\d)(\d{2,3}(?:[.,]5)?)(?!\d)")
+_STOCK_MARKER_RE = re.compile(r"(?i)(налич|остат|шт|pcs|pc|available|in\s*stock)")
+_STOCK_SEPARATOR_RE = re.compile(r"[,;/()]")
+_STOCK_SIZE_RANGE_RE = re.compile(r"\b\d{2,3}(?:[.,]5)?\s*[-–—]\s*\d{2,3}(?:[.,]5)?\b")
+_LIST_SEPARATOR_RE = re.compile(r"[,;/]")
+_SIZE_TOKEN_RE = re.compile(r"\b\d{2,3}(?:[.,]5)?\b")
+_QTY_MARKER_RE = re.compile(r"(?i)(шт|pcs|pc|qty|остат|налич)|[:=]")
+_TELEGRAM_LINK_RE = re.compile(r"(?:t\.me|telegram\.me)/", re.I)
+
+
+_TITLE_HEADER_KEYS = ("товар", "назв", "title", "item", "модель", "наимен", "product", "позиц")
+_COLOR_HEADER_KEYS = ("цвет", "color")
+_SIZE_HEADER_KEYS = ("размер", "size")
+_STOCK_HEADER_KEYS = ("остат", "налич", "stock", "qty", "кол-во")
+# every keyword that can give a row a header_score: a title/color/size/stock
+# column, or a price column (_pick_price_column only matches dropship/purchase words)
+_HEADER_ROLE_RE = _keywords_re(
+    _TITLE_HEADER_KEYS
+    + _COLOR_HEADER_KEYS
+    + _SIZE_HEADER_KEYS
+    + _STOCK_HEADER_KEYS
+    + ("дроп", "dropship", "drop", "опт", "wholesale", "price", "цена", "стоим")
+)
+
+
+def _may_be_header_row(row_cells: list[str]) -> bool:
+    # cheap gate before the full per-column layout probe: plain data rows carry
+    # no role keyword and at most one bare size number
+    if _HEADER_ROLE_RE.search("\n".join(row_cells).lower()):
+        return True
+    return sum(1 for c in row_cells if _parse_size_header_token(c)) >= 2
+
+
+def _compute_catalog_layout(header_like: list[str]) -> dict[str, Any]:
+    idx_title_local = _find_col(header_like, _TITLE_HEADER_KEYS)
+    idx_price_local = _pick_price_column(header_like)
+    idx_rrc_local = _find_col(header_like, ("ррц", "rrc", "мрц", "mrc", "розниц", "retail"))
+    idx_color_local = _find_col(header_like, _COLOR_HEADER_KEYS)
+    idx_size_local = _find_col(header_like, _SIZE_HEADER_KEYS)
+    idx_stock_local = _find_col(header_like, _STOCK_HEADER_KEYS)
+    idx_image_cols_local = _find_cols(header_like, ("фото", "image", "img", "картин", "photo", "pic", "ссыл", "url"))
+    idx_desc_local = _find_col(header_like, ("опис", "desc", "description"))
+    size_header_cols_local: list[tuple[int, str]] = []
+    for idx, h in enumerate(header_like):
+        parsed_size = _parse_size_header_token(h)
+        if parsed_size:
+            size_header_cols_local.append((idx, parsed_size))
+    return {
+        "idx_title": idx_title_local,
+        "idx_price": idx_price_local,
+        "idx_rrc": idx_rrc_local,
+        "idx_color": idx_color_local,
+        "idx_size": idx_size_local,
+        "idx_stock": idx_stock_local,
+        "idx_image_cols": idx_image_cols_local,
+        "idx_desc": idx_desc_local,
+        "size_header_cols": size_header_cols_local,
+    }
 
-    def _compute_layout(header_like: list[str]):
-        idx_title_local = _find_col(header_like, ("товар", "назв", "title", "item", "модель", "наимен", "product", "позиц"))
-        idx_price_local = _pick_price_column(header_like)
-        idx_rrc_local = _find_col(header_like, ("ррц", "rrc", "мрц", "mrc", "розниц", "retail"))
-        idx_color_local = _find_col(header_like, ("цвет", "color"))
-        idx_size_local = _find_col(header_like, ("размер", "size"))
-        idx_stock_local = _find_col(header_like, ("остат", "налич", "stock", "qty", "кол-во"))
-        idx_image_cols_local = _find_cols(header_like, ("фото", "image", "img", "картин", "photo", "pic", "ссыл", "url"))
-        idx_desc_local = _find_col(header_like, ("опис", "desc", "description"))
-        size_header_cols_local: list[tuple[int, str]] = []
-        for idx, h in enumerate(header_like):
-            parsed_size = _parse_size_header_token(h)
-            if parsed_size:
-                size_header_cols_local.append((idx, parsed_size))
-        return {
-            "idx_title": idx_title_local,
-            "idx_price": idx_price_local,
-            "idx_rrc": idx_rrc_local,
-            "idx_color": idx_color_local,
-            "idx_size": idx_size_local,
-            "idx_stock": idx_stock_local,
-            "idx_image_cols": idx_image_cols_local,
-            "idx_desc": idx_desc_local,
-            "size_header_cols": size_header_cols_local,
-        }
-
-    layout = _compute_layout([str(x or "").strip() for x in rows[0]])
 
+def _initial_catalog_layout(rows: list[list[str]]) -> dict[str, Any]:
+    layout = _compute_catalog_layout([str(x or "").strip() for x in rows[0]])
     if layout["idx_title"] is None:
         layout["idx_title"] = 0
     if layout["idx_price"] is None and len(rows[0]) >= 2:
         layout["idx_price"] = 1
+    return layout
+
 
+def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[dict[str, Any]]:
+    if not rows:
+        return []
+    out, _, _ = _scan_catalog_rows(rows, _initial_catalog_layout(rows), max_items=max_items)
+    return out
+
+
+def _scan_catalog_rows(
+    rows: list[list[str]],
+    layout: dict[str, Any],
+    *,
+    max_items: int,
+    has_prior_items: bool = False,
+) -> tuple[list[dict[str, Any]], list[str], dict[str, Any]]:
+    """Parse data rows under `layout`; returns (items, leading sidecar images, final layout).
+
+    `has_prior_items` marks a slice that continues an earlier one: sidecar images
+    found before its first item belong to the previous slice's last item.
+    """
+    layout = dict(layout)
     out: list[dict[str, Any]] = []
+    orphan_images: list[str] = []
     for row in rows:
         if len(out) >= max_items:
             break
 
         row_cells = [str(x or "").strip() for x in row]
         row_joined = " ".join([_norm(x).lower() for x in row if _norm(x)])
-        looks_like_sidecar_label = bool(re.search(r"(?i)(ссылка\s*на\s*фото|фото|photo\s*link|замер|measure)", row_joined))
-
-        dynamic_layout = _compute_layout(row_cells)
-        header_score = sum(
-            1
-            for key in ("idx_title", "idx_price", "idx_size", "idx_stock", "idx_color")
-            if dynamic_layout.get(key) is not None
-        ) + (1 if len(dynamic_layout["size_header_cols"]) >= 2 else 0)
-        header_keyword_hits = len(re.findall(r"(?i)(товар|назв|price|цена|размер|size|налич|stock|цвет|color|фото|image)", " ".join(row_cells)))
-        looks_like_header_row = (
-            (header_score >= 2 and not _looks_like_title(" ".join(row_cells[:2])))
-            or (len(out) == 0 and header_score >= 1 and header_keyword_hits >= 2)
-        )
+        looks_like_sidecar_label = bool(_SIDECAR_LABEL_RE.search(row_joined))
+
+        looks_like_header_row = False
+        if _may_be_header_row(row_cells):
+            dynamic_layout = _compute_catalog_layout(row_cells)
+            header_score = sum(
+                1
+                for key in ("idx_title", "idx_price", "idx_size", "idx_stock", "idx_color")
+                if dynamic_layout.get(key) is not None
+            ) + (1 if len(dynamic_layout["size_header_cols"]) >= 2 else 0)
+            header_keyword_hits = len(_HEADER_KEYWORD_RE.findall(" ".join(row_cells)))
+            looks_like_header_row = (
+                (header_score >= 2 and not _looks_like_title(" ".join(row_cells[:2])))
+                or (not out and not has_prior_items and header_score >= 1 and header_keyword_hits >= 2)
+            )
         if looks_like_header_row:
             for k, v in dynamic_layout.items():
                 if v is None:
@@ -961,14 +1149,11 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
                     if u not in side_images:
                         side_images.append(u)
             if side_images and out:
-                prev = out[-1]
-                prev_urls = list(prev.get("image_urls") or [])
+                _attach_sidecar_images(out[-1], side_images)
+            elif side_images and has_prior_items:
                 for u in side_images:
-                    if u not in prev_urls:
-                        prev_urls.append(u)
-                prev["image_urls"] = prev_urls
-                if not prev.get("image_url") and prev_urls:
-                    prev["image_url"] = prev_urls[0]
+                    if u not in orphan_images:
+                        orphan_images.append(u)
             continue
 
         raw_price = None
@@ -983,12 +1168,11 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
             continue
 
         if price < MIN_REASONABLE_DROPSHIP_PRICE:
-            excluded_low = {x for x in [idx_title, idx_size, idx_stock] if x is not None}
-            alt_low = [x for x in _price_candidates_from_row(row, exclude_indices=excluded_low) if x >= MIN_REASONABLE_DROPSHIP_PRICE]
+            alt_low = [x for x in _price_candidates_from_row(row, exclude_indices=excluded) if x >= MIN_REASONABLE_DROPSHIP_PRICE]
             if alt_low:
                 price = float(max(alt_low))
 
-        if re.search(r"(?i)\b(new\s*balance|nb\s*\d|nike|adidas|jordan|yeezy|air\s*max|vomero|samba|gazelle|campus|574|9060|1906|2002)\b", title) and price < 1200:
+        if _FOOTWEAR_BRAND_RE.search(title) and price < 1200:
             excluded_with_price = set(excluded)
             if idx_price is not None:
                 excluded_with_price.add(idx_price)
@@ -1018,8 +1202,9 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
         if not size:
             size = _extract_size_from_row_text(row) or ""
         if not size:
+            size_skip_cols = {x for x in [idx_title, idx_price, idx_rrc, idx_stock] if x is not None}
             for ci, cell in enumerate(row):
-                if ci in {x for x in [idx_title, idx_price, idx_rrc, idx_stock] if x is not None}:
+                if ci in size_skip_cols:
                     continue
                 if _looks_like_size_expression(cell):
                     inferred = split_size_tokens(cell)
@@ -1030,7 +1215,7 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
         stock_raw = _norm(row[idx_stock]) if idx_stock is not None and idx_stock < len(row) else ""
         if not stock_raw:
             # Fallback: infer availability cell when stock column was not detected reliably.
-            parsed_row_sizes = set(split_size_tokens(size)) if size else set()
+            parsed_row_sizes = {str(x).replace(",", ".") for x in split_size_tokens(size)} if size else set()
             ignored_cols = {x for x in [idx_title, idx_price, idx_rrc, idx_color, idx_size] if x is not None}
             ignored_cols.update(idx_image_cols or [])
             for ci, cell in enumerate(row):
@@ -1043,14 +1228,15 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
                 if _split_image_urls(txt):
                     continue
                 # skip likely prices
-                if _to_float(txt) and float(_to_float(txt) or 0) >= 500:
+                as_price = _to_float(txt)
+                if as_price and as_price >= 500:
                     continue
-                size_hits = [str(m.group(1) or "").replace(",", ".") for m in re.finditer(r"(?<!\d)(\d{2,3}(?:[.,]5)?)(?!\d)", txt)]
+                size_hits = [str(m.group(1) or "").replace(",", ".") for m in _SIZE_NUMBER_RE.finditer(txt)]
                 size_hits = [x for x in size_hits if 20 <= float(x) <= 60]
                 if not size_hits:
                     continue
-                has_markers = bool(re.search(r"(?i)(налич|остат|шт|pcs|pc|available|in\s*stock)", low)) or bool(re.search(r"[,;/()]", txt))
-                if parsed_row_sizes and any(h in {str(x).replace(',', '.') for x in parsed_row_sizes} for h in size_hits):
+                has_markers = bool(_STOCK_MARKER_RE.search(low)) or bool(_STOCK_SEPARATOR_RE.search(txt))
+                if parsed_row_sizes and any(h in parsed_row_sizes for h in size_hits):
                     stock_raw = txt
                     break
                 if has_markers:
@@ -1084,9 +1270,9 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
         stock: int | None = None
         if stock_raw:
             raw_stock_for_int = str(stock_raw)
-            looks_like_size_range = bool(re.search(r"\b\d{2,3}(?:[.,]5)?\s*[-–—]\s*\d{2,3}(?:[.,]5)?\b", raw_stock_for_int))
-            looks_like_size_list = bool(re.search(r"[,;/]", raw_stock_for_int)) and bool(re.search(r"\b\d{2,3}(?:[.,]5)?\b", raw_stock_for_int))
-            has_qty_markers = bool(re.search(r"(?i)(шт|pcs|pc|qty|остат|налич)|[:=]", raw_stock_for_int))
+            looks_like_size_range = bool(_STOCK_SIZE_RANGE_RE.search(raw_stock_for_int))
+            looks_like_size_list = bool(_LIST_SEPARATOR_RE.search(raw_stock_for_int)) and bool(_SIZE_TOKEN_RE.search(raw_stock_for_int))
+            has_qty_markers = bool(_QTY_MARKER_RE.search(raw_stock_for_int))
             if not looks_like_size_range and (not looks_like_size_list or has_qty_markers):
                 stock = _to_int(stock_raw)
         if stock_map:
@@ -1104,7 +1290,7 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
             if u not in image_urls:
                 image_urls.append(u)
         image_url = image_urls[0] if image_urls else None
-        post_link = next((u for u in image_urls if re.search(r"(?:t\.me|telegram\.me)/", str(u), flags=re.I)), None)
+        post_link = next((u for u in image_urls if _TELEGRAM_LINK_RE.search(str(u))), None)
         description = _norm(row[idx_desc]) if idx_desc is not None and idx_desc < len(row) else ""
 
         out.append({
@@ -1121,6 +1307,71 @@ def extract_catalog_items(rows: list[list[str]], max_items: int = 60) -> list[di
             "post_link": post_link,
             "description": description or None,
         })
+    return out, orphan_images, layout
+
+
+def _attach_sidecar_images(item: dict[str, Any], side_images: list[str]) -> None:
+    prev_urls = list(item.get("image_urls") or [])
+    for u in side_images:
+        if u not in prev_urls:
+            prev_urls.append(u)
+    item["image_urls"] = prev_urls
+    if not item.get("image_url") and prev_urls:
+        item["image_url"] = prev_urls[0]
+
+
+def _parallel_parse_workers() -> int:
+    try:
+        return int(os.getenv("SUPPLIER_IMPORT_PARALLEL_WORKERS") or 0)
+    except Exception:
+        return 0
+
+
+def extract_catalog_items_parallel(
+    rows: list[list[str]],
+    max_items: int = 60,
+    *,
+    workers: int | None = None,
+    chunksize: int = 2000,
+) -> list[dict[str, Any]]:
+    """Same output as extract_catalog_items, with row slices parsed in worker processes.
+
+    Off unless `workers` (or SUPPLIER_IMPORT_PARALLEL_WORKERS) is above 1, and always
+    serial inside daemon processes (Celery prefork workers), which may not fork
+    children of their own. Each slice
+    is parsed speculatively under the first-row layout; a slice is re-parsed in
+    process when that guess is wrong (a mid-sheet header changed the layout, no
+    items precede it, or it crosses the max_items cutoff).
+    """
+    n_workers = _parallel_parse_workers() if workers is None else int(workers)
+    chunksize = max(1, int(chunksize))
+    if not rows or n_workers <= 1 or len(rows) <= chunksize or multiprocessing.current_process().daemon:
+        return extract_catalog_items(rows, max_items=max_items)
+
+    base_layout = _initial_catalog_layout(rows)
+    chunks = [rows[i : i + chunksize] for i in range(0, len(rows), chunksize)]
+    out: list[dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [
+            pool.submit(_scan_catalog_rows, chunk, base_layout, max_items=len(chunk), has_prior_items=i > 0)
+            for i, chunk in enumerate(chunks)
+        ]
+        layout = base_layout
+        for i, (chunk, fut) in enumerate(zip(chunks, futures)):
+            remaining = int(max_items) - len(out)
+            if remaining <= 0:
+                break
+            items, orphans, end_layout = fut.result()
+            if layout != base_layout or bool(out) != (i > 0) or len(items) >= remaining:
+                items, orphans, end_layout = _scan_catalog_rows(
+                    chunk, layout, max_items=remaining, has_prior_items=bool(out)
+                )
+            if orphans and out:
+                _attach_sidecar_images(out[-1], orphans)
+            out.extend(items)
+            layout = end_layout
+        for fut in futures:
+            fut.cancel()
     return out
 
 
@@ -1323,52 +1574,81 @@ def extract_image_urls_from_html_page(url: str, timeout_sec: int = 20, limit: in
     return urls[:limit]
 
 
-def _load_image_for_analysis(image_bytes: bytes):
+def _load_gray_image_for_signature(image_bytes: bytes):
     try:
         from PIL import Image  # type: ignore
-        return Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        img = Image.open(io.BytesIO(image_bytes))
+        # JPEG: let libjpeg decode straight to a downscaled grayscale image
+        # (DCT-domain scaling) instead of a full-size RGB decode; no-op otherwise
+        img.draft("L", (64, 64))
+        return img.convert("L")
     except Exception as exc:
         raise RuntimeError("Pillow is required for image analysis. Add pillow to backend requirements.") from exc
 
 
+# Signature/color lookups are memoized per url: one import run (and the
+# gallery clustering inside it) asks for the same images many times.
+# The memo lives for one run only (see clear_image_lookup_caches), so an image
+# re-uploaded behind the same url is re-analyzed by the next import.
+# Failures raise inside the cached helpers, so they are not cached and a
+# transient network error is retried on the next call.
+@lru_cache(maxsize=4096)
+def _image_print_signature_cached(url: str, timeout_sec: int) -> str | None:
+    gray = _load_gray_image_for_signature(_download_image_bytes(url, timeout_sec=timeout_sec))
+
+    # simple average hash 8x8
+    px = list(gray.resize((8, 8)).getdata())
+    if not px:
+        return None
+    avg = sum(px) / len(px)
+    bits = "".join("1" if p >= avg else "0" for p in px)
+    # hex string, one digit per 4 bits
+    return f"{int(bits, 2):0{len(bits) // 4}x}"
+
+
 def image_print_signature_from_url(url: str, timeout_sec: int = 20) -> str | None:
     try:
-        img = _load_image_for_analysis(_download_image_bytes(url, timeout_sec=timeout_sec))
-
-        # simple average hash 8x8
-        gray = img.convert("L").resize((8, 8))
-        px = list(gray.getdata())
-        if not px:
-            return None
-        avg = sum(px) / len(px)
-        bits = "".join("1" if p >= avg else "0" for p in px)
-        # hex string
-        out = ""
-        for i in range(0, len(bits), 4):
-            out += f"{int(bits[i:i+4], 2):x}"
-        return out
+        return _image_print_signature_cached(url, int(timeout_sec))
     except Exception:
         return None
 
 
+@lru_cache(maxsize=4096)
+def _dominant_color_name_cached(url: str) -> str | None:
+    result = detect_product_color([url])
+    if not isinstance(result, dict):
+        return None
+    if not result.get("per_image"):
+        # image could not be fetched/decoded: keep it out of the cache
+        raise RuntimeError("no image analyzed")
+    confidence = float(result.get("confidence") or 0.0)
+    if confidence < 0.55:
+        return None
+    color = normalize_color_to_whitelist(result.get("color"))
+    return color or None
+
+
 def dominant_color_name_from_url(url: str, timeout_sec: int = 20) -> str | None:
     try:
-        result = detect_product_color([url])
-        if not isinstance(result, dict):
-            return None
-        confidence = float(result.get("confidence") or 0.0)
-        if confidence < 0.55:
-            return None
-        color = normalize_color_to_whitelist(result.get("color"))
-        return color or None
+        return _dominant_color_name_cached(url)
     except Exception:
         return None
 
 
+def clear_image_lookup_caches() -> None:
+    # called at the start of each import run to scope the url memo to it
+    _image_print_signature_cached.cache_clear()
+    _dominant_color_name_cached.cache_clear()
+
+
+_RUB_PRICE_RE = re.compile(r"(\d[\d\s]{1,9})\s?₽")
+
+
 def _extract_prices_from_text(text: str) -> list[float]:
     out: list[float] = []
-    for m in re.findall(r"(\d[\d\s]{1,9})\s?₽", text or ""):
-        s = str(m).replace(" ", "")
+    for m in _RUB_PRICE_RE.findall(text or ""):
+        # avito groups thousands with nbsp / narrow nbsp, not only plain spaces
+        s = "".join(str(m).split())
         try:
             out.append(float(s))
         except Exception:
@@ -1417,18 +1697,24 @@ def avito_market_scan(query: str, max_pages: int = 1, timeout_sec: int = 20, onl
     }
 
     pages = max(1, min(int(max_pages or 1), 3))
-    for page in range(1, pages + 1):
+    q_for_search = f"{q} новый" if only_new and "нов" not in q.lower() else q
+
+    def _scan_page(page: int) -> tuple[list[float], str | None]:
         try:
-            q_for_search = f"{q} новый" if only_new and "нов" not in q.lower() else q
             url = f"https://www.avito.ru/rossiya?cd=1&p={page}&q={requests.utils.quote(q_for_search)}"
             r = _http_get_with_retries(url, timeout_sec=timeout_sec, headers=headers, max_attempts=3)
-            txt = r.text or ""
-            found = _extract_prices_from_text(txt)
-            prices.extend(found)
-            if not found:
-                errors.append(f"page {page}: no prices parsed")
+            found = _extract_prices_from_text(r.text or "")
+            return found, (None if found else f"page {page}: no prices parsed")
         except Exception as exc:
-            errors.append(f"page {page}: {exc}")
+            return [], f"page {page}: {exc}"
+
+    # pages are independent and network-bound: fetch them concurrently,
+    # results are still merged in page order
+    with ThreadPoolExecutor(max_workers=pages) as pool:
+        for found, error in pool.map(_scan_page, range(1, pages + 1)):
+            prices.extend(found)
+            if error:
+                errors.append(error)
 
     suggested = estimate_market_price(prices)
     return {
@@ -1440,6 +1726,9 @@ def avito_market_scan(query: str, max_pages: int = 1, timeout_sec: int = 20, onl
     }
 
 
+_HEX_SIGNATURE_RE = re.compile(r"[0-9a-f]+")
+
+
 def print_signature_hamming(a: str | None, b: str | None) -> int | None:
     if not a or not b:
         return None
@@ -1447,10 +1736,44 @@ def print_signature_hamming(a: str | None, b: str | None) -> int | None:
     bb = str(b).strip().lower()
     if len(aa) != len(bb):
         return None
-    try:
-        return sum(1 for x, y in zip(aa, bb) if x != y)
-    except Exception:
-        return None
+    if not (_HEX_SIGNATURE_RE.fullmatch(aa) and _HEX_SIGNATURE_RE.fullmatch(bb)):
+        try:
+            return sum(1 for x, y in zip(aa, bb) if x != y)
+        except Exception:
+            return None
+    return _hex_digit_diff_count(int(aa, 16) ^ int(bb, 16), len(aa))
+
+
+@lru_cache(maxsize=64)
+def _hex_digit_mask(width: int) -> int:
+    return int("1" * width, 16)
+
+
+def _hex_digit_diff_count(diff: int, width: int) -> int:
+    # distance counts differing hex digits: fold each nibble of the xor onto
+    # its low bit, then a single popcount replaces the per-char python loop
+    diff |= diff >> 1
+    diff |= diff >> 2
+    return (diff & _hex_digit_mask(width)).bit_count()
+
+
+def _batch_signature_hamming(ref_sig: str, signatures: list[str | None]) -> list[int | None]:
+    """Batch form of print_signature_hamming: the reference is parsed once."""
+    ref = str(ref_sig or "").strip().lower()
+    if not _HEX_SIGNATURE_RE.fullmatch(ref):
+        return [print_signature_hamming(ref_sig, sig) for sig in signatures]
+    ref_int = int(ref, 16)
+    out: list[int | None] = []
+    for sig in signatures:
+        cand = str(sig or "").strip().lower()
+        if len(cand) != len(ref) or not _HEX_SIGNATURE_RE.fullmatch(cand):
+            out.append(print_signature_hamming(ref, sig))
+            continue
+        out.append(_hex_digit_diff_count(ref_int ^ int(cand, 16), len(ref)))
+    return out
+
+
+_IMAGE_IO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="image-io")
 
 
 def find_similar_images(
@@ -1464,23 +1787,42 @@ def find_similar_images(
     ref_url = (reference_image_url or "").strip()
     if not ref_url:
         return []
-    ref_sig = image_print_signature_from_url(ref_url)
-    if not ref_sig:
-        return []
-    ref_color = dominant_color_name_from_url(ref_url)
 
-    out: list[dict[str, Any]] = []
+    cand_urls: list[str] = []
     seen: set[str] = set()
     for raw in candidate_image_urls:
         cand_url = (raw or "").strip()
         if not cand_url or cand_url in seen or cand_url == ref_url:
             continue
         seen.add(cand_url)
-        cand_sig = image_print_signature_from_url(cand_url)
-        dist = print_signature_hamming(ref_sig, cand_sig)
-        if dist is None or dist > int(max_hamming_distance):
-            continue
-        cand_color = dominant_color_name_from_url(cand_url)
+        cand_urls.append(cand_url)
+    if not cand_urls:
+        return []
+
+    ref_sig = image_print_signature_from_url(ref_url)
+    if not ref_sig:
+        return []
+    # signature lookups are network-bound on cache misses: overlap them
+    if len(cand_urls) > 1:
+        cand_sigs = list(_IMAGE_IO_POOL.map(image_print_signature_from_url, cand_urls))
+    else:
+        cand_sigs = [image_print_signature_from_url(u) for u in cand_urls]
+    distances = _batch_signature_hamming(ref_sig, cand_sigs)
+    survivors = [
+        (cand_url, dist)
+        for cand_url, dist in zip(cand_urls, distances)
+        if dist is not None and dist <= int(max_hamming_distance)
+    ]
+    if not survivors:
+        return []
+    # the reference color is only a score hint: resolve it once, and only
+    # when at least one candidate passed the signature filter; color lookups
+    # for the survivors overlap the same way the signature fetches do
+    color_urls = [ref_url] + [cand_url for cand_url, _ in survivors]
+    ref_color, *cand_colors = _IMAGE_IO_POOL.map(dominant_color_name_from_url, color_urls)
+
+    out: list[dict[str, Any]] = []
+    for (cand_url, dist), cand_color in zip(survivors, cand_colors):
         score = max(0.0, 1.0 - (float(dist) / max(1.0, float(max_hamming_distance))))
         if ref_color and cand_color and ref_color == cand_color:
             score = min(1.0, score + 0.08)
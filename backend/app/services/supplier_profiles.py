@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 
 
 @dataclass(frozen=True)
@@ -39,6 +40,8 @@ def get_supplier_profile(raw_supplier: str | None) -> SupplierProfile | None:
     return None
 
 
+# pure function of (title, supplier) over static profiles; titles repeat heavily across feed rows
+@lru_cache(maxsize=8192)
 def normalize_title_for_supplier(title: str | None, raw_supplier: str | None) -> str:
     t = str(title or "").strip()
     if not t:
@@ -0,0 +1,16 @@
+import pytest
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture()
+def db_session(_engine):
+    """Session inside an outer transaction that is rolled back after the test."""
+    conn = _engine.connect()
+    trans = conn.begin()
+    db = Session(bind=conn, join_transaction_mode="create_savepoint")
+    try:
+        yield db
+    finally:
+        db.close()
+        trans.rollback()
+        conn.close()
@@ -1,27 +1,8 @@
 from decimal import Decimal
 
-import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-from app.db.models import Base, Commission, ManagerAssistant, Order, User, UserRole
+from app.db.models import Commission, ManagerAssistant, Order, User, UserRole
 from app.services.commissions import compute_and_apply_commissions
 
-TEST_DB = "sqlite:///:memory:"
-
-
-@pytest.fixture()
-def db_session():
-    engine = create_engine(TEST_DB, echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    try:
-        yield session
-    finally:
-        session.close()
-        Base.metadata.drop_all(engine)
-
 
 def test_compute_and_apply_commissions_manager_and_assistant_first_n(db_session):
     manager_user = User(
@@ -1,23 +1,7 @@
 from decimal import Decimal
-import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 import app.api.v1.admin_supplier_intelligence as asi
-from app.db.models import Base, Product, ProductVariant, Color
-
-
-@pytest.fixture()
-def db_session():
-    engine = create_engine("sqlite:///:memory:", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    try:
-        yield session
-    finally:
-        session.close()
-        Base.metadata.drop_all(engine)
+from app.db.models import Product, ProductVariant, Color
 
 
 def test_build_color_assignment_returns_combo_for_significant_two_tone(monkeypatch):
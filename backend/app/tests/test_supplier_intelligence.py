@@ -1,9 +1,81 @@
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+
 import app.api.v1.admin_supplier_intelligence as asi
 import app.services.supplier_intelligence as si
 import app.services.media_store as media_store
 from app.services.supplier_intelligence import SupplierOffer, detect_source_kind, ensure_min_markup_price, estimate_market_price, extract_catalog_items, find_similar_images, generate_ai_product_description, generate_youth_description, map_category, pick_best_offer, print_signature_hamming, split_size_tokens, suggest_sale_price
 
 
+class _DummyResp:
+    def __init__(
+        self,
+        status_code: int = 200,
+        *,
+        headers: dict | None = None,
+        content: bytes = b"",
+        text: str = "",
+        json_data: dict | None = None,
+        encoding: str | None = None,
+        apparent_encoding: str | None = None,
+    ):
+        self.status_code = status_code
+        self.headers = {"content-type": "text/html"} if headers is None else headers
+        self.content = content
+        self.text = text
+        self.encoding = encoding
+        self._json_data = json_data
+        self._apparent_encoding = apparent_encoding
+        self.charset_detections = 0
+        self.body_read = False
+        self.closed = False
+
+    @property
+    def apparent_encoding(self):
+        # requests runs charset detection over the whole body here
+        self.charset_detections += 1
+        return self._apparent_encoding
+
+    def json(self):
+        return self._json_data
+
+    def iter_content(self, chunk_size=1):
+        self.body_read = True
+        yield self.content
+
+    def close(self):
+        self.closed = True
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"status={self.status_code}")
+
+
+@pytest.fixture(scope="module")
+def similar_image_signatures():
+    return {
+        "https://ref/img.jpg": "aaaa",
+        "https://cand/1.jpg": "aaab",
+        "https://cand/2.jpg": "aabb",
+        "https://cand/far.jpg": "bbbb",
+    }
+
+
+@pytest.fixture(scope="module")
+def similar_image_colors():
+    return {
+        "https://ref/img.jpg": "черный",
+        "https://cand/1.jpg": "черный",
+        "https://cand/2.jpg": "белый",
+        "https://cand/far.jpg": "красный",
+    }
+
+
 def test_estimate_market_price_ignores_fake_outliers():
     prices = [1, 2, 4500, 4700, 4900, 5100, 1_000_000]
     got = estimate_market_price(prices)
@@ -27,6 +99,18 @@ def test_pick_best_offer_prefers_exact_color_and_size_then_price():
     assert best.supplier == "B"
 
 
+def test_rank_offers_orders_exact_then_in_stock_then_rest():
+    offers = [
+        SupplierOffer(supplier="A", title="Худи", color="white", size="M", dropship_price=1000, stock=0),
+        SupplierOffer(supplier="B", title="Худи", color="black", size="M", dropship_price=2900, stock=0),
+        SupplierOffer(supplier="C", title="Худи", color="white", size="M", dropship_price=2500, stock=9),
+        SupplierOffer(supplier="D", title="Худи", color="black", size="M", dropship_price=2700, stock=1),
+    ]
+    ranked = si.rank_offers(offers, desired_color="black", desired_size="M")
+    assert [o.supplier for o in ranked] == ["D", "B", "C", "A"]
+    assert [o.supplier for o in si.rank_offers(offers, "black", "M", limit=2)] == ["D", "B"]
+
+
 def test_detect_source_kind_google_sheet():
     assert detect_source_kind("https://docs.google.com/spreadsheets/d/abc/edit") == "google_sheet"
 
@@ -42,8 +126,6 @@ def test_extract_catalog_items_by_header():
     assert items[0]["dropship_price"] == 3990.0
 
 
-
-
 def test_extract_catalog_items_does_not_take_model_number_as_size_without_marker():
     rows = [
         ["Товар", "Дроп цена"],
@@ -137,8 +219,6 @@ def test_extract_catalog_items_splits_multiple_image_urls():
     assert items[0]["image_urls"] == ["https://cdn/a.jpg", "https://cdn/b.jpg", "https://cdn/c.jpg"]
 
 
-
-
 def test_extract_catalog_items_prefers_dropship_price_over_wholesale():
     rows = [
         ["Товар", "Опт цена", "Дроп цена", "Цвет"],
@@ -163,7 +243,6 @@ def test_extract_catalog_items_uses_wholesale_when_dropship_column_missing():
     assert items[0]["dropship_price"] == 1900.0
 
 
-
 def test_extract_catalog_items_skips_rrc_mrc_and_picks_dropship():
     rows = [
         ["Товар", "РРЦ", "МРЦ", "Цена дроп", "Цвет"],
@@ -188,28 +267,14 @@ def test_extract_catalog_items_ignores_rrc_when_only_generic_price_exists():
     assert items[0]["dropship_price"] == 2190.0
 
 
-
 def test_infer_colors_with_ai_disabled_returns_empty(monkeypatch):
     monkeypatch.setenv("DISABLED_AI_KEY", "test-key")
 
     captured = {}
 
-    class R:
-        content = b"1"
-
-        def raise_for_status(self):
-            return None
-
-        def json(self):
-            return {
-                "choices": [
-                    {"message": {"content": '{"colors":["black","white"]}'}}
-                ]
-            }
-
     def _fake_post(*args, **kwargs):
         captured["payload"] = kwargs.get("json") or {}
-        return R()
+        return _DummyResp(content=b"1", json_data={"choices": [{"message": {"content": '{"colors":["black","white"]}'}}]})
 
     monkeypatch.setattr(si.requests, "post", _fake_post)
     got = si.infer_colors_with_ai(
@@ -223,20 +288,8 @@ def test_infer_colors_with_ai_disabled_returns_empty(monkeypatch):
 def test_infer_colors_with_ai_fallback_parses_plain_text(monkeypatch):
     monkeypatch.setenv("DISABLED_AI_KEY", "test-key")
 
-    class R:
-        content = b"1"
-
-        def raise_for_status(self):
-            return None
-
-        def json(self):
-            return {
-                "choices": [
-                    {"message": {"content": "black, beige"}}
-                ]
-            }
-
-    monkeypatch.setattr(si.requests, "post", lambda *a, **k: R())
+    resp = _DummyResp(content=b"1", json_data={"choices": [{"message": {"content": "black, beige"}}]})
+    monkeypatch.setattr(si.requests, "post", lambda *a, **k: resp)
     got = si.infer_colors_with_ai(title="Yeezy", image_urls=["https://cdn/a.jpg"], provider="disabled")
     assert got == ["black"]
 def test_generate_youth_description_mentions_title():
@@ -250,8 +303,6 @@ def test_split_size_tokens_supports_lists_and_ranges():
     assert split_size_tokens("42-44") == ["42", "43", "44"]
 
 
-
-
 def test_extract_catalog_items_preserves_non_numeric_stock_text():
     rows = [
         ["Товар", "Цена дроп", "Размер", "Наличие"],
@@ -265,9 +316,6 @@ def test_extract_catalog_items_preserves_non_numeric_stock_text():
     assert items[0]["stock_text"] == "в наличии"
 
 
-
-
-
 def test_extract_catalog_items_detects_header_on_second_row_and_keeps_availability():
     rows = [
         ["Прайс на 12.01", ""],
@@ -305,21 +353,9 @@ def test_extract_catalog_items_infers_stock_cell_when_stock_header_missing():
     assert items[0]["stock_text"] == "в наличии 42"
     assert items[0]["stock"] in (None, 42)
 
-def test_find_similar_images_filters_by_hamming_distance(monkeypatch):
-    signatures = {
-        "https://ref/img.jpg": "aaaa",
-        "https://cand/1.jpg": "aaab",
-        "https://cand/2.jpg": "aabb",
-        "https://cand/far.jpg": "bbbb",
-    }
-    colors = {
-        "https://ref/img.jpg": "черный",
-        "https://cand/1.jpg": "черный",
-        "https://cand/2.jpg": "белый",
-        "https://cand/far.jpg": "красный",
-    }
-    monkeypatch.setattr(si, "image_print_signature_from_url", lambda url: signatures.get(url))
-    monkeypatch.setattr(si, "dominant_color_name_from_url", lambda url: colors.get(url))
+def test_find_similar_images_filters_by_hamming_distance(monkeypatch, similar_image_signatures, similar_image_colors):
+    monkeypatch.setattr(si, "image_print_signature_from_url", similar_image_signatures.get)
+    monkeypatch.setattr(si, "dominant_color_name_from_url", similar_image_colors.get)
 
     out = find_similar_images(
         "https://ref/img.jpg",
@@ -346,6 +382,38 @@ def test_suggest_sale_price_markup():
     assert suggest_sale_price(1000) >= 1500
 
 
+def test_image_print_signature_from_url_caches_success_but_not_failures(monkeypatch):
+    from PIL import Image
+    import io
+
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 16), (10, 200, 30)).save(buf, format="PNG")
+    payload = buf.getvalue()
+    calls = {"n": 0}
+
+    def fake_download(url, *a, **k):
+        calls["n"] += 1
+        if "broken" in url:
+            raise RuntimeError("timeout")
+        return payload
+
+    monkeypatch.setattr(si, "_download_image_bytes", fake_download)
+
+    first = si.image_print_signature_from_url("https://cdn.example.com/cached.png")
+    assert first is not None
+    assert si.image_print_signature_from_url("https://cdn.example.com/cached.png") == first
+    assert calls["n"] == 1
+
+    assert si.image_print_signature_from_url("https://cdn.example.com/broken.png") is None
+    assert si.image_print_signature_from_url("https://cdn.example.com/broken.png") is None
+    assert calls["n"] == 3
+
+    # a new import run starts with an empty memo
+    si.clear_image_lookup_caches()
+    assert si.image_print_signature_from_url("https://cdn.example.com/cached.png") == first
+    assert calls["n"] == 4
+
+
 def test_print_signature_hamming_distance():
     assert print_signature_hamming("aaaa", "aaab") == 1
 
@@ -354,6 +422,13 @@ def test_print_signature_hamming_returns_none_for_different_lengths():
     assert print_signature_hamming("aaaa", "aaa") is None
 
 
+def test_print_signature_hamming_counts_differing_hex_digits():
+    assert print_signature_hamming("0f0f", "f0f0") == 4
+    assert print_signature_hamming("ffff", "fffe") == 1
+    assert print_signature_hamming("ABCD", "abcd") == 0
+    assert print_signature_hamming("zz-1", "zz-2") == 1
+
+
 def test_extract_catalog_items_skips_non_positive_price_rows():
     rows = [
         ["Товар", "Дроп цена", "Цвет"],
@@ -367,22 +442,11 @@ def test_extract_catalog_items_skips_non_positive_price_rows():
 def test_http_get_with_retries_retries_on_429(monkeypatch):
     calls = {"n": 0}
 
-    class DummyResp:
-        def __init__(self, code: int):
-            self.status_code = code
-            self.headers = {"content-type": "text/html"}
-            self.text = "ok"
-            self.content = b"ok"
-
-        def raise_for_status(self):
-            if self.status_code >= 400:
-                raise RuntimeError(f"status={self.status_code}")
-
     def fake_get(*args, **kwargs):
         calls["n"] += 1
-        return DummyResp(429 if calls["n"] == 1 else 200)
+        return _DummyResp(429 if calls["n"] == 1 else 200, content=b"ok", text="ok")
 
-    monkeypatch.setattr(si.requests, "get", fake_get)
+    monkeypatch.setattr(si._HTTP_SESSION, "get", fake_get)
     monkeypatch.setattr(si.time, "sleep", lambda *_: None)
 
     resp = si._http_get_with_retries("https://example.com", max_attempts=3)
@@ -390,16 +454,107 @@ def test_http_get_with_retries_retries_on_429(monkeypatch):
     assert calls["n"] == 2
 
 
-def test_download_image_bytes_rejects_non_image_content(monkeypatch):
-    class DummyResp:
-        status_code = 200
-        headers = {"content-type": "text/html"}
-        content = b"<html></html>"
+def test_http_get_with_retries_honours_retry_after(monkeypatch):
+    calls = {"n": 0}
+    sleeps: list[float] = []
 
-        def raise_for_status(self):
-            return None
+    def fake_get(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return _DummyResp(429, headers={"Retry-After": "2"})
+        return _DummyResp(200)
 
-    monkeypatch.setattr(si, "_http_get_with_retries", lambda *a, **k: DummyResp())
+    monkeypatch.setattr(si._HTTP_SESSION, "get", fake_get)
+    monkeypatch.setattr(si.time, "sleep", sleeps.append)
+
+    resp = si._http_get_with_retries("https://example.com", max_attempts=3)
+    assert resp.status_code == 200
+    assert sleeps == [2.0]
+
+
+def test_http_get_with_retries_closes_streamed_response_on_error_status(monkeypatch):
+    resp = _DummyResp(404)
+    monkeypatch.setattr(si._HTTP_SESSION, "get", lambda *args, **kwargs: resp)
+
+    with pytest.raises(RuntimeError):
+        si._http_get_with_retries("https://example.com", max_attempts=1, stream=True)
+    assert resp.closed
+
+
+def test_http_get_with_retries_makes_exactly_max_attempts_on_ssl_errors(monkeypatch):
+    # plain TCP listener answering TLS handshakes with HTTP: every attempt is an SSLError
+    accepted: list[int] = []
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    listener.settimeout(0.2)
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                continue
+            accepted.append(1)
+            with conn:
+                conn.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    monkeypatch.setattr(si.time, "sleep", lambda *_: None)
+    started = time.monotonic()
+    try:
+        with pytest.raises(RuntimeError) as excinfo:
+            si._http_get_with_retries(f"https://127.0.0.1:{listener.getsockname()[1]}/", timeout_sec=2, max_attempts=3)
+    finally:
+        stop.set()
+        thread.join()
+        listener.close()
+
+    # the pool adapter does not retry on its own: one connection per attempt
+    assert isinstance(excinfo.value.__cause__, requests.exceptions.SSLError)
+    assert len(accepted) == 3
+    assert time.monotonic() - started < 5
+
+
+def test_http_session_does_not_keep_cookies_between_requests():
+    # a local server that sets a cookie and echoes back what the client sent
+    seen_cookie_headers: list[str] = []
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+
+    def serve():
+        for _ in range(2):
+            conn, _ = listener.accept()
+            with conn:
+                head = b""
+                while b"\r\n\r\n" not in head:
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        break
+                    head += chunk
+                cookies = [ln for ln in head.decode("latin-1").split("\r\n") if ln.lower().startswith("cookie:")]
+                seen_cookie_headers.extend(cookies)
+                conn.sendall(b"HTTP/1.1 200 OK\r\nSet-Cookie: antibot=1; Path=/\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{listener.getsockname()[1]}/"
+    try:
+        si._HTTP_SESSION.get(url, timeout=(2, 2))
+        si._HTTP_SESSION.get(url, timeout=(2, 2))
+    finally:
+        thread.join(timeout=5)
+        listener.close()
+
+    assert seen_cookie_headers == []
+    assert len(si._HTTP_SESSION.cookies) == 0
+
+
+def test_download_image_bytes_rejects_non_image_content(monkeypatch):
+    monkeypatch.setattr(si, "_http_get_with_retries", lambda *a, **k: _DummyResp(content=b"<html></html>"))
 
     try:
         si._download_image_bytes("https://example.com/not-image")
@@ -408,6 +563,16 @@ def test_download_image_bytes_rejects_non_image_content(monkeypatch):
         assert "not an image" in str(exc)
 
 
+def test_download_image_bytes_rejects_oversized_declared_length_without_reading(monkeypatch):
+    resp = _DummyResp(headers={"content-type": "image/jpeg", "content-length": "7000000"}, content=b"x" * 7_000_000)
+    monkeypatch.setattr(si, "_http_get_with_retries", lambda *a, **k: resp)
+
+    try:
+        si._download_image_bytes("https://example.com/huge.jpg", max_bytes=6_000_000)
+        assert False, "expected RuntimeError"
+    except RuntimeError as exc:
+        assert "too large" in str(exc)
+    assert not resp.body_read
 
 
 def test_split_color_tokens_accepts_multiple_delimiters():
@@ -415,22 +580,13 @@ def test_split_color_tokens_accepts_multiple_delimiters():
     assert got == ["black", "white", "red", "navy"]
 
 
-
-
 def test_save_remote_image_to_local_accepts_octet_stream_with_image_ext(monkeypatch, tmp_path):
     captured = {}
 
-    class DummyResp:
-        headers = {"content-type": "application/octet-stream"}
-        content = b"\x89PNG\r\n\x1a\n1234"
-
-        def raise_for_status(self):
-            return None
-
-    def _fake_get(url, timeout=None, headers=None):
+    def _fake_get(url, timeout=None, headers=None, **kwargs):
         captured["url"] = url
         captured["headers"] = headers or {}
-        return DummyResp()
+        return _DummyResp(headers={"content-type": "application/octet-stream"}, content=b"\x89PNG\r\n\x1a\n1234")
 
     monkeypatch.setattr(media_store.requests, "get", _fake_get)
     monkeypatch.setattr(media_store, "UPLOAD_BASE", tmp_path)
@@ -616,13 +772,14 @@ def test_normalize_error_message_compacts_whitespace():
 
 
 def test_response_text_decodes_cp1251_payload():
-    class DummyResp:
-        content = "ЦЕНА ОПТ".encode("cp1251")
-        encoding = None
-        apparent_encoding = "windows-1251"
-        text = ""
+    resp = _DummyResp(content="ЦЕНА ОПТ".encode("cp1251"), apparent_encoding="windows-1251")
+    assert si._response_text(resp) == "ЦЕНА ОПТ"
 
-    assert si._response_text(DummyResp()) == "ЦЕНА ОПТ"
+
+def test_response_text_skips_charset_detection_for_utf8_payload():
+    resp = _DummyResp(content="Цена дроп".encode("utf-8"))
+    assert si._response_text(resp) == "Цена дроп"
+    assert resp.charset_detections == 0
 
 
 def test_fix_common_mojibake_repairs_utf8_latin1_artifacts():
@@ -635,27 +792,28 @@ def test_fix_common_mojibake_keeps_clean_text_unchanged():
     assert si._fix_common_mojibake("Цена дроп") == "Цена дроп"
 
 
+def test_fix_common_mojibake_repairs_mixed_clean_and_broken_text():
+    broken = "Цена дроп".encode("utf-8").decode("latin-1")
+    assert si._fix_common_mojibake(f"Худи {broken}") == "Худи Цена дроп"
+
+
 def test_ensure_min_markup_price_enforces_40_percent_floor():
     assert ensure_min_markup_price(1200, dropship_price=1000) == 1400.0
     assert ensure_min_markup_price(1700, dropship_price=1000) == 1700.0
 
 
-def test_avito_market_scan_appends_new_keyword(monkeypatch):
-    captured = {"urls": []}
+def test_extract_prices_from_text_handles_nbsp_thousand_groups():
+    assert si._extract_prices_from_text("Цена 4\u00a0990\u00a0₽, 12 500 ₽ и 7\u202f300 ₽") == [4990.0, 12500.0, 7300.0]
 
-    class DummyResp:
-        status_code = 200
-        headers = {"content-type": "text/html"}
-        text = "Цена 4 990 ₽"
 
-        def raise_for_status(self):
-            return None
+def test_avito_market_scan_appends_new_keyword(monkeypatch):
+    captured = {"urls": []}
 
     def fake_get(url, *args, **kwargs):
         captured["urls"].append(url)
-        return DummyResp()
+        return _DummyResp(text="Цена 4 990 ₽")
 
-    monkeypatch.setattr(si.requests, "get", fake_get)
+    monkeypatch.setattr(si._HTTP_SESSION, "get", fake_get)
 
     result = si.avito_market_scan("худи alpha", max_pages=1, only_new=True)
 
@@ -762,13 +920,7 @@ def test_split_size_tokens_parses_mixed_size_marks_and_ranges():
     assert si.split_size_tokens("41–43") == ["41", "42", "43"]
 
 
-
-
 def test_extract_image_urls_from_html_page_expands_telegram_post_block(monkeypatch):
-    class DummyResp:
-        def __init__(self, text: str):
-            self.text = text
-
     html_single = '<meta property="og:image" content="https://cdn4.telesco.pe/file/preview.jpg">'
     html_public = (
         '<div class="tgme_widget_message_wrap"><div class="tgme_widget_message" data-post="firmachdroppp/3183">'
@@ -780,10 +932,10 @@ def test_extract_image_urls_from_html_page_expands_telegram_post_block(monkeypat
 
     def fake_get(url, **kwargs):
         if url == "https://t.me/firmachdroppp/3183":
-            return DummyResp(html_single)
+            return _DummyResp(text=html_single)
         if url == "https://t.me/s/firmachdroppp/3183":
-            return DummyResp(html_public)
-        return DummyResp("")
+            return _DummyResp(text=html_public)
+        return _DummyResp(text="")
 
     monkeypatch.setattr(si, "_http_get_with_retries", fake_get)
 
@@ -876,8 +1028,6 @@ def test_extract_catalog_items_reads_stock_map_from_stock_column():
     assert items[0]["stock_map"] == {"42": 1, "43": 2}
 
 
-
-
 def test_extract_catalog_items_reads_plain_size_list_from_stock_column_as_stock_map():
     rows = [
         ["Товар", "Дроп цена", "Размер", "Наличие"],
@@ -992,7 +1142,6 @@ def test_extract_catalog_items_appends_sidecar_photo_link_rows_to_previous_item(
     ]
 
 
-
 def test_extract_shop_vkus_stock_map_from_text_blob():
     item = {
         "title": "Кроссы",
@@ -1011,9 +1160,6 @@ def test_extract_shop_vkus_stock_map_marks_plain_available_sizes_as_in_stock():
     assert got == {"41": 1, "42": 1, "44": 1}
 
 
-
-
-
 def test_extract_shop_vkus_stock_map_marks_plain_space_separated_sizes_as_in_stock():
     item = {
         "title": "Кроссы",
@@ -1023,7 +1169,6 @@ def test_extract_shop_vkus_stock_map_marks_plain_space_separated_sizes_as_in_sto
     assert got == {"41": 1, "42": 1, "44": 1}
 
 
-
 def test_extract_shop_vkus_stock_map_does_not_treat_spaced_range_as_in_stock_list():
     item = {
         "title": "Кроссы",
@@ -1042,7 +1187,6 @@ def test_extract_shop_vkus_stock_map_reads_cyrillic_availability_keys():
     assert got == {"42": 1}
 
 
-
 def test_dominant_color_name_from_url_prefers_vivid_accent_over_gray(monkeypatch):
     from PIL import Image
     import io
@@ -1060,8 +1204,6 @@ def test_dominant_color_name_from_url_prefers_vivid_accent_over_gray(monkeypatch
     assert got == "фиолетовый"
 
 
-
-
 def test_dominant_color_name_from_url_prefers_center_over_red_background(monkeypatch):
     from PIL import Image
     import io
@@ -1158,7 +1300,6 @@ def test_extract_image_urls_from_html_page_reads_escaped_telescope_urls(monkeypa
     ]
 
 
-
 def test_rerank_gallery_images_prefers_higher_score(monkeypatch):
     scores = {
         "/uploads/products/a.jpg": 10.0,
@@ -1297,3 +1438,31 @@ def test_single_color_assignment_disables_color_selector(monkeypatch):
     assert assignment["color_tokens"] == [""]
     assert assignment["detected_color"] == "black"
     assert assignment["variant_images_by_color"][""] == ["img1", "img2", "img3", "img4"]
+
+
+def test_extract_catalog_items_parallel_matches_sequential():
+    rows = [["Товар", "Дроп цена", "Цвет", "Размер", "Наличие", "Фото"]]
+    for i in range(30):
+        rows.append([f"Худи Model{i}", str(1500 + i * 10), "Черный", "M", "2", f"https://cdn.example.com/{i}.jpg"])
+        if i % 7 == 0:
+            rows.append(["Фото", f"https://cdn.example.com/side{i}.jpg", "", "", "", ""])
+        if i == 15:
+            rows.append(["Наличие", "Товар", "Цена", "Размер", "Цвет", "Фото"])
+
+    expected = si.extract_catalog_items(rows, max_items=25)
+    got = si.extract_catalog_items_parallel(rows, max_items=25, workers=2, chunksize=4)
+    assert got == expected
+
+
+def test_extract_catalog_items_parallel_stays_serial_in_daemon_workers(monkeypatch):
+    rows = [["Товар", "Дроп цена", "Размер"]] + [[f"Худи Model{i}", str(1500 + i), "M"] for i in range(20)]
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("daemon processes cannot start a process pool")
+
+    # Celery prefork workers are daemonic and may not have children
+    monkeypatch.setattr(si.multiprocessing, "current_process", lambda: SimpleNamespace(daemon=True))
+    monkeypatch.setattr(si, "ProcessPoolExecutor", no_pool)
+
+    got = si.extract_catalog_items_parallel(rows, max_items=25, workers=2, chunksize=4)
+    assert got == si.extract_catalog_items(rows, max_items=25)
@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Base
+from app.services import supplier_intelligence
+
+
+@pytest.fixture(scope="session")
+def _engine():
+    """One in-memory SQLite schema per test process (so per xdist worker with `-n auto`).
+
+    Shared by the tests/ and app/tests/ trees; their conftests wrap it in
+    rolled-back sessions (`tmp_db`, `db_session`).
+    """
+    engine = create_engine(
+        "sqlite://",
+        future=True,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # pysqlite manages BEGIN itself and breaks SAVEPOINT; let SQLAlchemy emit it
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def _clear_image_lookup_caches():
+    """Keep the per-url image signature/color memo from leaking between tests."""
+    supplier_intelligence.clear_image_lookup_caches()
+    yield
+    supplier_intelligence.clear_image_lookup_caches()
@@ -0,0 +1,44 @@
+"""Shared DB wiring for one-shot maintenance scripts.
+
+Scripts run once and exit, so they skip the app's connection pool (NullPool)
+and keep their single Postgres connection alive with TCP keepalives instead.
+"""
+
+from __future__ import annotations
+
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+_PG_KEEPALIVE_ARGS = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 5,
+    "keepalives_count": 5,
+}
+
+
+def database_url() -> str | None:
+    return os.getenv("DATABASE_URL") or None
+
+
+def get_engine(url: str | None = None) -> Engine:
+    from app.db.session import DATABASE_URL, insertmanyvalues_page_size
+
+    # same default as the app (inside the backend container)
+    url = url or database_url() or DATABASE_URL
+    connect_args = dict(_PG_KEEPALIVE_ARGS) if make_url(url).get_backend_name() == "postgresql" else {}
+    return create_engine(
+        url,
+        poolclass=NullPool,
+        connect_args=connect_args,
+        insertmanyvalues_page_size=insertmanyvalues_page_size(),
+        future=True,
+    )
+
+
+def get_session(url: str | None = None) -> Session:
+    return sessionmaker(bind=get_engine(url), autocommit=False, autoflush=False)()
@@ -13,51 +13,80 @@ from __future__ import annotations
 
 from typing import Any
 
-from app.db.session import SessionLocal
+from sqlalchemy import update
+
+from _db import get_session
 from app.db import models
 from app.services.color_detection import normalize_color_to_whitelist
 
+BATCH_SIZE = 1000
+
 
 def _uniq_extend(dst: list[str], items: list[str]) -> None:
     seen = set(dst)
-    for u in items:
-        uu = str(u or "").strip()
-        if not uu or uu in seen:
-            continue
-        dst.append(uu)
-        seen.add(uu)
+    cleaned = dict.fromkeys(str(u or "").strip() for u in items)
+    dst.extend(u for u in cleaned if u and u not in seen)
+
+
+def _fixed_media_meta(meta: Any) -> dict[str, Any] | None:
+    """Return meta with the 'multi' bucket folded into general_images, or None if unchanged."""
+    if not isinstance(meta, dict):
+        return None
+    by_key = meta.get("images_by_color_key")
+    if not isinstance(by_key, dict) or not by_key.get("multi"):
+        return None
+    moved = [u for u in (str(x).strip() for x in (by_key.get("multi") or [])) if u]
+    by_key = {k: v for k, v in by_key.items() if k != "multi"}
+    general = [u for u in (str(x).strip() for x in (meta.get("general_images") or [])) if u]
+    _uniq_extend(general, moved)
+    return {**meta, "images_by_color_key": by_key, "general_images": general}
 
 
 def main() -> None:
-    db = SessionLocal()
+    db = get_session()
     try:
-        products = (
-            db.query(models.Product)
-            .filter(models.Product.detected_color == "multi")
-            .all()
-        )
-
         touched = 0
-        for p in products:
-            p.detected_color = None
-            p.detected_color_confidence = None
-
-            meta: Any = getattr(p, "import_media_meta", None) or {}
-            if isinstance(meta, dict):
-                by_key = meta.get("images_by_color_key")
-                if isinstance(by_key, dict) and by_key.get("multi"):
-                    moved = [str(x).strip() for x in (by_key.get("multi") or []) if str(x).strip()]
-                    by_key.pop("multi", None)
-                    meta["images_by_color_key"] = by_key
-                    general = [str(x).strip() for x in (meta.get("general_images") or []) if str(x).strip()]
-                    _uniq_extend(general, moved)
-                    meta["general_images"] = general
-                    p.import_media_meta = meta
-
-            db.add(p)
-            touched += 1
-
-        db.commit()
+        last_id = 0
+        while True:
+            # keyset pages of (id, meta) only: bounded memory, no ORM objects to flush
+            rows = (
+                db.query(models.Product.id, models.Product.import_media_meta)
+                .filter(models.Product.detected_color == "multi", models.Product.id > last_id)
+                .order_by(models.Product.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            simple_ids: list[int] = []
+            meta_updates: list[dict[str, Any]] = []
+            for pid, meta in rows:
+                new_meta = _fixed_media_meta(meta)
+                if new_meta is None:
+                    simple_ids.append(pid)
+                else:
+                    meta_updates.append(
+                        {
+                            "id": pid,
+                            "detected_color": None,
+                            "detected_color_confidence": None,
+                            "import_media_meta": new_meta,
+                        }
+                    )
+
+            if simple_ids:
+                db.execute(
+                    update(models.Product)
+                    .where(models.Product.id.in_(simple_ids))
+                    .values(detected_color=None, detected_color_confidence=None)
+                )
+            if meta_updates:
+                db.bulk_update_mappings(models.Product, meta_updates)
+            db.commit()
+            touched += len(rows)
+
         print(f"OK: cleaned {touched} products")
 
     finally:
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
 
 from app.db import models
 from app.db.base import Base
-from app.db.session import engine, SessionLocal
+from app.db.session import engine
 
 
 @dataclass(frozen=True)
@@ -26,72 +29,85 @@ SEED: tuple[SupplierSeed, ...] = (
 )
 
 
-def _upsert_source(db, *, source_url: str, supplier_name: str, manager_contact: str, role_note: str) -> str:
-    item = db.query(models.SupplierSource).filter(models.SupplierSource.source_url == source_url).one_or_none()
-    if item is None:
-        item = models.SupplierSource(
-            source_url=source_url,
-            supplier_name=supplier_name,
-            manager_name=manager_contact.lstrip("@"),
-            manager_contact=manager_contact,
-            note=role_note,
-            active=True,
-        )
-        db.add(item)
-        return "created"
-
-    changed = False
-    if item.supplier_name != supplier_name:
-        item.supplier_name = supplier_name
-        changed = True
-    if item.manager_contact != manager_contact:
-        item.manager_contact = manager_contact
-        changed = True
-    manager_name = manager_contact.lstrip("@")
-    if item.manager_name != manager_name:
-        item.manager_name = manager_name
-        changed = True
-    if item.note != role_note:
-        item.note = role_note
-        changed = True
-    if not bool(getattr(item, "active", True)):
-        item.active = True
-        changed = True
-    if changed:
-        db.add(item)
-        return "updated"
-    return "skipped"
+_UPSERT_COLUMNS = ("supplier_name", "manager_name", "manager_contact", "note", "active")
+
+
+def _expand(src: SupplierSeed):
+    for url, role in ((src.table_url, "price_stock_table"), (src.tg_channel_url, "tg_media")):
+        if url:
+            yield {
+                "source_url": url,
+                "supplier_name": src.supplier_name,
+                "manager_name": src.manager_contact.lstrip("@"),
+                "manager_contact": src.manager_contact,
+                "note": f"seed: стартовый набор • role={role}",
+                "active": True,
+            }
+
+
+_SEED_ROWS: tuple[dict, ...] = tuple(row for src in SEED for row in _expand(src))
+
+
+def _upsert_stmt(dialect_name: str, rows: list[dict]):
+    # None when the dialect has no INSERT ... ON CONFLICT
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    stmt = insert(models.SupplierSource).values(rows)
+    set_ = {c: stmt.excluded[c] for c in _UPSERT_COLUMNS}
+    set_["updated_at"] = datetime.utcnow()
+    return stmt.on_conflict_do_update(index_elements=["source_url"], set_=set_)
 
 
 def run_seed() -> None:
+    """Seed SEED into supplier_sources.
+
+    Runs in one Core transaction; writes are a single multi-VALUES upsert where
+    the dialect supports one, otherwise plain inserts/updates keyed off the
+    rows already read.
+    """
     Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    try:
-        counters = {"created": 0, "updated": 0, "skipped": 0}
-        for src in SEED:
-            if src.table_url:
-                res = _upsert_source(
-                    db,
-                    source_url=src.table_url,
-                    supplier_name=src.supplier_name,
-                    manager_contact=src.manager_contact,
-                    role_note="seed: стартовый набор • role=price_stock_table",
+    table = models.SupplierSource.__table__
+    counters = {"created": 0, "updated": 0, "skipped": 0}
+    with engine.begin() as conn:
+        # read to report what changed (and to pick insert vs update without an upsert)
+        existing = {
+            r.source_url: r
+            for r in conn.execute(
+                select(table.c.source_url, *(table.c[c] for c in _UPSERT_COLUMNS)).where(
+                    table.c.source_url.in_([r["source_url"] for r in _SEED_ROWS])
                 )
-                counters[res] += 1
-            if src.tg_channel_url:
-                res = _upsert_source(
-                    db,
-                    source_url=src.tg_channel_url,
-                    supplier_name=src.supplier_name,
-                    manager_contact=src.manager_contact,
-                    role_note="seed: стартовый набор • role=tg_media",
-                )
-                counters[res] += 1
-        db.commit()
-        print(f"supplier seed done: created={counters['created']} updated={counters['updated']} skipped={counters['skipped']}")
-    finally:
-        db.close()
-
+            )
+        }
+        pending: list[dict] = []
+        for row in _SEED_ROWS:
+            item = existing.get(row["source_url"])
+            if item is None:
+                counters["created"] += 1
+            elif any(getattr(item, c) != row[c] for c in _UPSERT_COLUMNS):
+                counters["updated"] += 1
+            else:
+                counters["skipped"] += 1
+                continue
+            pending.append(row)
+        stmt = _upsert_stmt(conn.dialect.name, pending) if pending else None
+        if stmt is not None:
+            conn.execute(stmt)
+        elif pending:
+            new_rows = [row for row in pending if row["source_url"] not in existing]
+            if new_rows:
+                conn.execute(table.insert(), new_rows)
+            for row in pending:
+                if row["source_url"] in existing:
+                    conn.execute(
+                        table.update()
+                        .where(table.c.source_url == row["source_url"])
+                        .values({c: row[c] for c in _UPSERT_COLUMNS})
+                    )
+    print(f"supplier seed done: created={counters['created']} updated={counters['updated']} skipped={counters['skipped']}")
 
 if __name__ == "__main__":
     run_seed()
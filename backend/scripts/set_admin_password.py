@@ -4,15 +4,36 @@ import argparse
 import sys
 import uuid
 import runpy
+from functools import lru_cache
 from getpass import getpass
-from sqlalchemy import create_engine
+from sqlalchemy import case, create_engine, literal, or_, select
 from sqlalchemy.orm import sessionmaker
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+DEFAULT_BCRYPT_ROUNDS = 12
+# bcrypt minimum; only meant for throwaway test/CI databases
+TEST_BCRYPT_ROUNDS = 4
+MAX_BCRYPT_ROUNDS = 31
 
-def hash_password(plain: str) -> str:
-    return pwd_context.hash(plain)
+
+def default_bcrypt_rounds() -> int:
+    if (os.getenv("APP_ENV") or "").strip().lower() == "test":
+        return TEST_BCRYPT_ROUNDS
+    return DEFAULT_BCRYPT_ROUNDS
+
+
+@lru_cache(maxsize=None)
+def _pwd_context(rounds: int):
+    # passlib is imported here so importing this module stays cheap
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def hash_password(plain: str, rounds: int | None = None) -> str:
+    rounds = default_bcrypt_rounds() if rounds is None else int(rounds)
+    if not TEST_BCRYPT_ROUNDS <= rounds <= MAX_BCRYPT_ROUNDS:
+        raise ValueError(f"bcrypt rounds must be between {TEST_BCRYPT_ROUNDS} and {MAX_BCRYPT_ROUNDS}")
+    return _pwd_context(rounds).hash(plain)
 
 def main():
     parser = argparse.ArgumentParser()
@@ -20,7 +41,16 @@ def main():
     parser.add_argument("--username", required=False, help="username")
     parser.add_argument("--password", help="Admin password (optional, will prompt if omitted)")
     parser.add_argument("--database-url", help="Optional DATABASE_URL (env fallback)")
+    parser.add_argument(
+        "--bcrypt-rounds",
+        type=int,
+        default=None,
+        help=f"bcrypt cost (default {DEFAULT_BCRYPT_ROUNDS}, {TEST_BCRYPT_ROUNDS} when APP_ENV=test)",
+    )
     args = parser.parse_args()
+    rounds = default_bcrypt_rounds() if args.bcrypt_rounds is None else args.bcrypt_rounds
+    if not TEST_BCRYPT_ROUNDS <= rounds <= MAX_BCRYPT_ROUNDS:
+        parser.error(f"--bcrypt-rounds must be between {TEST_BCRYPT_ROUNDS} and {MAX_BCRYPT_ROUNDS}")
 
     database_url = args.database_url or os.getenv("DATABASE_URL")
     if not database_url:
@@ -39,19 +69,26 @@ def main():
     # import models lazily
     from app.db import models
 
-    user = None
+    # one SELECT over the telegram_id (unique) and username indexes; a telegram_id match wins
+    conds = []
     if args.telegram_id:
-        user = session.query(models.User).filter(models.User.telegram_id == str(args.telegram_id)).first()
-    if not user and args.username:
-        user = session.query(models.User).filter(models.User.username == args.username).first()
+        conds.append(models.User.telegram_id == str(args.telegram_id))
+    if args.username:
+        conds.append(models.User.username == args.username)
+    user = None
+    if conds:
+        prefer_tg = case((conds[0], 0), else_=1) if args.telegram_id else literal(0)
+        user = session.scalars(
+            select(models.User).where(or_(*conds)).order_by(prefer_tg, models.User.id).limit(1)
+        ).first()
 
     if user:
         print(f"Found existing user id={user.id}, username={user.username}, role={user.role} — updating to admin and setting password.")
         user.role = "admin"
         if hasattr(user, "password_hash"):
-            user.password_hash = hash_password(pw)
+            user.password_hash = hash_password(pw, rounds)
         elif hasattr(user, "password"):
-            setattr(user, "password", hash_password(pw))
+            setattr(user, "password", hash_password(pw, rounds))
         else:
             print("Warning: user model has no password field 'password_hash' or 'password'.")
         session.add(user)
@@ -64,9 +101,9 @@ def main():
             
         )
         if hasattr(u, "password_hash"):
-            u.password_hash = hash_password(pw)
+            u.password_hash = hash_password(pw, rounds)
         elif hasattr(u, "password"):
-            setattr(u, "password", hash_password(pw))
+            setattr(u, "password", hash_password(pw, rounds))
         session.add(u)
 
     session.commit()
@@ -1,19 +1,105 @@
+from contextlib import contextmanager
+from io import BytesIO
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import requests
+from fastapi import UploadFile
+from PIL import Image, ImageDraw
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.services import importer_notifications, supplier_intelligence
+
+
+@pytest.fixture(autouse=True)
+def _no_network(monkeypatch):
+    """Fail outbound HTTP immediately instead of waiting on DNS/timeouts.
+
+    Code under test already treats connection errors as "no data", so this keeps
+    its offline behavior; tests that need responses patch `requests.get` etc.
+    """
+
+    def _offline(self, method, url, *args, **kwargs):
+        raise requests.ConnectionError(f"network disabled in tests: {method} {url}")
+
+    # requests.get/head/post and module-level sessions all go through Session.request
+    monkeypatch.setattr(requests.Session, "request", _offline)
+    # the shop_vkus extractor retries with backoff sleeps before the importer falls back to requests.get
+    monkeypatch.setattr(importer_notifications, "extract_image_urls_from_html_page", lambda *args, **kwargs: [])
 
-from app.db.models import Base
+    # offline every attempt fails the same way; skip the backoff sleeps between retries
+    http_get_with_retries = supplier_intelligence._http_get_with_retries
+    monkeypatch.setattr(
+        supplier_intelligence,
+        "_http_get_with_retries",
+        lambda url, **kwargs: http_get_with_retries(url, **{**kwargs, "max_attempts": 1}),
+    )
 
 
 @pytest.fixture()
-def tmp_db():
-    """In-memory DB session for backend/tests modules."""
-    engine = create_engine("sqlite:///:memory:", future=True)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-    db = Session()
+def tmp_db(_engine):
+    """In-memory DB session for backend/tests modules.
+
+    Each test runs inside an outer transaction that is rolled back afterwards;
+    commits made by the code under test only release SAVEPOINTs.
+    """
+    conn = _engine.connect()
+    trans = conn.begin()
+    db = Session(bind=conn, autoflush=False, join_transaction_mode="create_savepoint")
     try:
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(engine)
+        trans.rollback()
+        conn.close()
+
+
+@pytest.fixture()
+def count_selects():
+    """`with count_selects(db) as selects:` collects the SELECTs issued on db's connection.
+
+    Only SELECTs are kept: the tmp_db SAVEPOINT/RELEASE statements are not queries.
+    """
+
+    @contextmanager
+    def capture(db):
+        selects: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+
+        bind = db.get_bind()
+        event.listen(bind, "before_cursor_execute", _record)
+        try:
+            yield selects
+        finally:
+            event.remove(bind, "before_cursor_execute", _record)
+
+    return capture
+
+
+@pytest.fixture(scope="session")
+def png_bytes():
+    # tiny valid png payload header; content is irrelevant because media save is stubbed in tests.
+    return b"\x89PNG\r\n\x1a\n" + b"0" * 32
+
+
+@pytest.fixture()
+def png_upload(png_bytes):
+    def make(name: str = "test.png") -> UploadFile:
+        return UploadFile(filename=name, file=BytesIO(png_bytes), headers={"content-type": "image/png"})
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def color_scenes():
+    """In-memory product shots (solid object on white) for color detection tests."""
+
+    def make(rgb):
+        img = Image.new("RGB", (360, 360), (255, 255, 255))
+        ImageDraw.Draw(img).rectangle((90, 90, 270, 270), fill=rgb)
+        return img
+
+    return {"red": make((200, 30, 30)), "green": make((40, 160, 60)), "black": make((15, 15, 15))}
@@ -1,7 +1,4 @@
 from decimal import Decimal
-from io import BytesIO
-
-from fastapi import UploadFile
 
 from app.api.v1 import admin_products as ap
 from app.db import models
@@ -11,12 +8,6 @@ class _Admin:
     id = 1
 
 
-def _png_file(name: str = "test.png") -> UploadFile:
-    # tiny valid png payload header; content is irrelevant because media save is stubbed in tests.
-    data = BytesIO(b"\x89PNG\r\n\x1a\n" + b"0" * 32)
-    return UploadFile(filename=name, file=data, headers={"content-type": "image/png"})
-
-
 def test_create_product_minimal_creates_variant(tmp_db):
     res = ap.create_product(
         title="Basic product",
@@ -44,7 +35,7 @@ def test_create_product_minimal_creates_variant(tmp_db):
     assert variants[0].color_id is None
 
 
-def test_create_product_detects_color_from_image_when_missing_color(tmp_db, monkeypatch, tmp_path):
+def test_create_product_detects_color_from_image_when_missing_color(tmp_db, monkeypatch, tmp_path, png_upload):
     # Keep media save deterministic so create_product can run without touching real uploads.
     green_path = tmp_path / "green.png"
     green_path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"1" * 32)
@@ -63,7 +54,7 @@ def test_create_product_detects_color_from_image_when_missing_color(tmp_db, monk
         description=None,
         category_id=None,
         visible=True,
-        image=_png_file(),
+        image=png_upload(),
         images=None,
         sizes=None,
         color=None,
@@ -81,7 +72,7 @@ def test_create_product_detects_color_from_image_when_missing_color(tmp_db, monk
 
     variants = tmp_db.query(models.ProductVariant).filter(models.ProductVariant.product_id == p.id).all()
     assert len(variants) == 1
-    color = tmp_db.query(models.Color).get(variants[0].color_id)
+    color = tmp_db.get(models.Color, variants[0].color_id)
     assert color is not None
     assert color.name == "green"
 
@@ -131,8 +122,8 @@ def test_update_product_adds_missing_colorways_for_each_size(tmp_db):
 
     pairs = set()
     for v in variants:
-        size = tmp_db.query(models.Size).get(v.size_id).name if v.size_id else None
-        color = tmp_db.query(models.Color).get(v.color_id).name if v.color_id else None
+        size = tmp_db.get(models.Size, v.size_id).name if v.size_id else None
+        color = tmp_db.get(models.Color, v.color_id).name if v.color_id else None
         pairs.add((size, color))
 
     assert pairs == {("42", "black"), ("42", "white"), ("43", "black"), ("43", "white")}
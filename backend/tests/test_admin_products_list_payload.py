@@ -8,7 +8,7 @@ class _Admin:
     id = 1
 
 
-def test_admin_products_list_includes_colors_sizes_and_meta(tmp_db):
+def test_admin_products_list_includes_colors_sizes_and_meta(tmp_db, count_selects):
     color = models.Color(name="black")
     size = models.Size(name="42")
     product = models.Product(title="NB", slug="nb", base_price=Decimal("1000"), visible=True)
@@ -28,8 +28,11 @@ def test_admin_products_list_includes_colors_sizes_and_meta(tmp_db):
     )
     tmp_db.commit()
 
-    out = admin_api.admin_list_products(db=tmp_db, admin=_Admin(), q=None, page=1, per_page=50)
+    with count_selects(tmp_db) as selects:
+        out = admin_api.admin_list_products(db=tmp_db, admin=_Admin(), q=None, page=1, per_page=50)
 
+    # products (with windowed total) + selectin loads for variants, sizes, colors, images
+    assert len(selects) <= 5
     payload = out.model_dump()
     assert set(payload.keys()) == {"items", "total", "page", "pages", "limit"}
     assert payload["total"] == 1
@@ -70,3 +73,20 @@ def test_admin_products_list_uses_import_media_meta_color_keys_when_variants_mis
 
     payload = out.model_dump()
     assert payload["items"][0]["colors"] == ["black", "white"]
+
+
+def test_admin_products_list_reports_total_past_last_page(tmp_db):
+    tmp_db.add_all([
+        models.Product(title=f"P{i}", slug=f"p{i}", base_price=Decimal("100"), visible=True)
+        for i in range(3)
+    ])
+    tmp_db.commit()
+
+    first = admin_api.admin_list_products(db=tmp_db, admin=_Admin(), q=None, page=1, per_page=2).model_dump()
+    assert first["total"] == 3
+    assert first["pages"] == 2
+    assert len(first["items"]) == 2
+
+    beyond = admin_api.admin_list_products(db=tmp_db, admin=_Admin(), q=None, page=5, per_page=2).model_dump()
+    assert beyond["total"] == 3
+    assert beyond["items"] == []
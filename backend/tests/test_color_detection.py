@@ -1,8 +1,26 @@
-from PIL import Image
+import io
+import threading
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw
 
 from app.services import color_detection as cd
 
 
+def _result(color, confidence=0.6, *, cluster_share=0.6, sat=0.2, light=70, lab_b=1):
+    """Fake per-photo ImageColorResult for detect_product_color aggregation tests."""
+    return cd.ImageColorResult(
+        color=color,
+        confidence=confidence,
+        cluster_share=cluster_share,
+        sat=sat,
+        light=light,
+        lab_a=1,
+        lab_b=lab_b,
+        debug={},
+    )
+
+
 def test_beige_vs_yellow_low_saturation_prefers_beige():
     color = cd.canonical_color_from_lab_hsv(l=72, a=4, b=16, h=0.14, s=0.18, v=0.82)
     assert color == "beige"
@@ -18,31 +36,16 @@ def test_white_vs_gray_split():
     assert cd.canonical_color_from_lab_hsv(l=67, a=0, b=1, h=0.0, s=0.03, v=0.72) == "gray"
 
 
-def test_detect_product_color_for_5_images_forces_single(monkeypatch):
-    class R:
-        def __init__(self, color, conf, sat):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = 0.6
-            self.sat = sat
-            self.light = 70
-            self.lab_a = 1
-            self.lab_b = 10
-            self.debug = {}
-
+def test_detect_product_color_for_5_images_forces_single():
     seq = [
-        R("beige", 0.55, 0.2),
-        R("yellow", 0.35, 0.18),
-        R("beige", 0.50, 0.19),
-        R("yellow", 0.30, 0.16),
-        R("beige", 0.54, 0.21),
+        _result("beige", 0.55, lab_b=10),
+        _result("yellow", 0.35, sat=0.18, lab_b=10),
+        _result("beige", 0.5, sat=0.19, lab_b=10),
+        _result("yellow", 0.3, sat=0.16, lab_b=10),
+        _result("beige", 0.54, sat=0.21, lab_b=10),
     ]
 
-    def fake_detect(src):
-        return seq.pop(0)
-
-    monkeypatch.setattr(cd, "detect_color_from_image_source", fake_detect)
-    out = cd.detect_product_color(["1", "2", "3", "4", "5"], supplier_profile="shop_vkus")
+    out = cd.detect_product_color(["1", "2", "3", "4", "5"], supplier_profile="shop_vkus", precomputed=seq)
     assert out["color"] == "beige"
     assert out["debug"]["forced_single_for_5"] is True
     assert out["debug"]["palette_rule"] == "4_7_to_1"
@@ -76,62 +79,32 @@ def test_detect_product_colors_from_photos_returns_canonical(monkeypatch):
     assert out["display_color"] == "серый"
 
 
-def test_detect_product_color_avoids_false_gray_for_black_white_mix(monkeypatch):
-    class R:
-        def __init__(self, color, conf=0.6):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = 0.6
-            self.sat = 0.18
-            self.light = 62
-            self.lab_a = 1
-            self.lab_b = 1
-            self.debug = {}
-
+def test_detect_product_color_avoids_false_gray_for_black_white_mix():
     seq = [
-        R("gray", 0.62),
-        R("black", 0.61),
-        R("white", 0.59),
-        R("black", 0.57),
-        R("white", 0.55),
+        _result("gray", 0.62, sat=0.18, light=62),
+        _result("black", 0.61, sat=0.18, light=62),
+        _result("white", 0.59, sat=0.18, light=62),
+        _result("black", 0.57, sat=0.18, light=62),
+        _result("white", 0.55, sat=0.18, light=62),
     ]
 
-    def fake_detect(_src):
-        return seq.pop(0)
-
-    monkeypatch.setattr(cd, "detect_color_from_image_source", fake_detect)
-    out = cd.detect_product_color(["1", "2", "3", "4", "5"], supplier_profile="shop_vkus")
+    out = cd.detect_product_color(["1", "2", "3", "4", "5"], supplier_profile="shop_vkus", precomputed=seq)
     assert out["color"] == "black"
     assert out["color"] != "gray"
 
 
-def test_detect_product_color_for_7_images_still_forces_single(monkeypatch):
-    class R:
-        def __init__(self, color, conf, sat):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = 0.6
-            self.sat = sat
-            self.light = 70
-            self.lab_a = 1
-            self.lab_b = 10
-            self.debug = {}
-
+def test_detect_product_color_for_7_images_still_forces_single():
     seq = [
-        R("gray", 0.62, 0.18),
-        R("black", 0.61, 0.17),
-        R("white", 0.59, 0.16),
-        R("black", 0.57, 0.15),
-        R("white", 0.55, 0.14),
-        R("black", 0.56, 0.16),
-        R("white", 0.53, 0.15),
+        _result("gray", 0.62, sat=0.18, lab_b=10),
+        _result("black", 0.61, sat=0.17, lab_b=10),
+        _result("white", 0.59, sat=0.16, lab_b=10),
+        _result("black", 0.57, sat=0.15, lab_b=10),
+        _result("white", 0.55, sat=0.14, lab_b=10),
+        _result("black", 0.56, sat=0.16, lab_b=10),
+        _result("white", 0.53, sat=0.15, lab_b=10),
     ]
 
-    def fake_detect(_src):
-        return seq.pop(0)
-
-    monkeypatch.setattr(cd, "detect_color_from_image_source", fake_detect)
-    out = cd.detect_product_color(["1", "2", "3", "4", "5", "6", "7"], supplier_profile="shop_vkus")
+    out = cd.detect_product_color(["1", "2", "3", "4", "5", "6", "7"], supplier_profile="shop_vkus", precomputed=seq)
     assert out["color"] in {"black", "white", "purple", "gray", "beige", "yellow"}
     assert out["color"] not in {"multi", "black-white"}
 
@@ -140,91 +113,44 @@ def test_dark_neutral_prefers_black_over_gray():
     assert cd.canonical_color_from_lab_hsv(l=41, a=0, b=1, h=0.0, s=0.04, v=0.34) == "black"
 
 
-def test_detect_product_color_for_10_images_forces_two_colors(monkeypatch):
-    class R:
-        def __init__(self, color, conf=0.65, share=0.66):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = share
-            self.sat = 0.2
-            self.light = 68
-            self.lab_a = 1
-            self.lab_b = 1
-            self.debug = {}
-
-    seq = [
-        R("white"), R("black"), R("white"), R("black"), R("white"),
-        R("black"), R("white"), R("black"), R("gray", conf=0.3), R("gray", conf=0.28),
+def test_detect_product_color_for_10_images_forces_two_colors():
+    seq = [_result(c, 0.65, cluster_share=0.66, light=68) for c in ["white", "black"] * 4] + [
+        _result("gray", 0.3, cluster_share=0.66, light=68),
+        _result("gray", 0.28, cluster_share=0.66, light=68),
     ]
 
-    monkeypatch.setattr(cd, "detect_color_from_image_source", lambda _src: seq.pop(0))
-    out = cd.detect_product_color([str(i) for i in range(10)], supplier_profile="shop_vkus")
+    out = cd.detect_product_color([str(i) for i in range(10)], supplier_profile="shop_vkus", precomputed=seq)
     assert out["color"] in {"black-white", "white-black"}
     assert out["debug"]["palette_rule"] == "10_14_to_2"
 
 
-def test_detect_product_color_for_15_images_forces_three_colors(monkeypatch):
-    class R:
-        def __init__(self, color, conf=0.64, share=0.64):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = share
-            self.sat = 0.22
-            self.light = 66
-            self.lab_a = 1
-            self.lab_b = 1
-            self.debug = {}
+def test_detect_product_color_for_15_images_forces_three_colors():
+    seq = [_result(c, 0.64, cluster_share=0.64, sat=0.22, light=66) for c in ["black", "white", "red"] * 5]
 
-    seq = [
-        R("black"), R("white"), R("red"), R("black"), R("white"),
-        R("red"), R("black"), R("white"), R("red"), R("black"),
-        R("white"), R("red"), R("black"), R("white"), R("red"),
-    ]
-
-    monkeypatch.setattr(cd, "detect_color_from_image_source", lambda _src: seq.pop(0))
-    out = cd.detect_product_color([str(i) for i in range(15)], supplier_profile="shop_vkus")
+    out = cd.detect_product_color([str(i) for i in range(15)], supplier_profile="shop_vkus", precomputed=seq)
     assert out["color"] == "black-white-red"
     assert out["debug"]["palette_rule"] == "15_21_to_3"
 
 
-def test_detect_product_color_photo_count_rules_not_global(monkeypatch):
-    class R:
-        def __init__(self, color, conf=0.65, share=0.66):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = share
-            self.sat = 0.2
-            self.light = 68
-            self.lab_a = 1
-            self.lab_b = 1
-            self.debug = {}
-
-    seq = [
-        R("white"), R("black"), R("white"), R("black"), R("white"),
-        R("black"), R("white"), R("black"), R("gray", conf=0.3), R("gray", conf=0.28),
+def test_detect_product_color_photo_count_rules_not_global():
+    seq = [_result(c, 0.65, cluster_share=0.66, light=68) for c in ["white", "black"] * 4] + [
+        _result("gray", 0.3, cluster_share=0.66, light=68),
+        _result("gray", 0.28, cluster_share=0.66, light=68),
     ]
 
-    monkeypatch.setattr(cd, "detect_color_from_image_source", lambda _src: seq.pop(0))
-    out = cd.detect_product_color([str(i) for i in range(10)], supplier_profile="other_supplier")
+    out = cd.detect_product_color([str(i) for i in range(10)], supplier_profile="other_supplier", precomputed=seq)
     assert out["debug"]["palette_rule"] == "default"
     assert out["color"] == "black-white"
 
 
-def test_detect_product_color_for_4_images_forces_single(monkeypatch):
-    class R:
-        def __init__(self, color, conf=0.6, sat=0.2):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = 0.6
-            self.sat = sat
-            self.light = 70
-            self.lab_a = 1
-            self.lab_b = 8
-            self.debug = {}
-
-    seq = [R("gray",0.55), R("black",0.62), R("gray",0.56), R("black",0.61)]
-    monkeypatch.setattr(cd, "detect_color_from_image_source", lambda _src: seq.pop(0))
-    out = cd.detect_product_color(["1", "2", "3", "4"], supplier_profile="shop_vkus")
+def test_detect_product_color_for_4_images_forces_single():
+    seq = [
+        _result("gray", 0.55, lab_b=8),
+        _result("black", 0.62, lab_b=8),
+        _result("gray", 0.56, lab_b=8),
+        _result("black", 0.61, lab_b=8),
+    ]
+    out = cd.detect_product_color(["1", "2", "3", "4"], supplier_profile="shop_vkus", precomputed=seq)
     assert out["color"] in {"black", "gray"}
     assert out["debug"]["palette_rule"] == "4_7_to_1"
 
@@ -237,28 +163,16 @@ def test_dark_neutral_boundary_prefers_black_not_gray():
     assert cd.canonical_color_from_lab_hsv(l=45, a=0, b=1, h=0.0, s=0.05, v=0.40) == "black"
 
 
-def test_detect_product_color_default_aggregation_black_white_combo(monkeypatch):
-    class R:
-        def __init__(self, color, conf=0.65, share=0.66):
-            self.color = color
-            self.confidence = conf
-            self.cluster_share = share
-            self.sat = 0.2
-            self.light = 68
-            self.lab_a = 1
-            self.lab_b = 1
-            self.debug = {}
-
+def test_detect_product_color_default_aggregation_black_white_combo():
     seq = [
-        R("black", conf=0.65),
-        R("black", conf=0.64),
-        R("white", conf=0.62),
-        R("white", conf=0.61),
-        R("gray", conf=0.10),
+        _result("black", 0.65, cluster_share=0.66, light=68),
+        _result("black", 0.64, cluster_share=0.66, light=68),
+        _result("white", 0.62, cluster_share=0.66, light=68),
+        _result("white", 0.61, cluster_share=0.66, light=68),
+        _result("gray", 0.1, cluster_share=0.66, light=68),
     ]
 
-    monkeypatch.setattr(cd, "detect_color_from_image_source", lambda _src: seq.pop(0))
-    out = cd.detect_product_color(["1", "2", "3", "4", "5"], supplier_profile="other_supplier")
+    out = cd.detect_product_color(["1", "2", "3", "4", "5"], supplier_profile="other_supplier", precomputed=seq)
     assert out["color"] == "black-white"
 
 
@@ -275,3 +189,71 @@ def test_normalize_combo_only_for_allowed_pairs(monkeypatch):
 
 def test_normalize_palette_supports_three_colors():
     assert cd.normalize_palette_color_key(["red", "white", "black"], max_colors=3) == "black-white-red"
+
+
+def test_detect_product_color_rejects_precomputed_length_mismatch():
+    with pytest.raises(ValueError):
+        cd.detect_product_color(["1", "2", "3"], precomputed=[_result("black"), _result("white")])
+
+
+def test_detect_product_color_fetches_remote_photos_concurrently_in_order(monkeypatch):
+    colors = ["red", "blue", "green"]
+    finished = [threading.Event() for _ in colors]
+
+    def fake_detect(src):
+        idx = int(src.rsplit("/", 1)[-1])
+        # each photo waits for the next one, so later photos finish first;
+        # per_image must still follow input order
+        if idx + 1 < len(colors):
+            assert finished[idx + 1].wait(timeout=5), "photos were not fetched concurrently"
+        finished[idx].set()
+        return _result(colors[idx], sat=0.3, light=60)
+
+    monkeypatch.setattr(cd, "detect_color_from_image_source", fake_detect)
+    out = cd.detect_product_color([f"https://cdn.example/{i}" for i in range(len(colors))])
+    assert [x["color"] for x in out["per_image"]] == colors
+
+
+def test_extract_subject_pixels_keeps_black_and_white_subject():
+    img = Image.new("RGB", (220, 220), (255, 255, 255))
+    for x in range(60, 160):
+        for y in range(60, 160):
+            img.putpixel((x, y), (12, 12, 12) if x < 110 else (240, 228, 210))
+
+    pixels = cd._extract_subject_pixels(img)
+    assert len(pixels) > 100
+    assert (12, 12, 12) in pixels
+    # warm off-white subject survives, pure white background does not
+    assert (240, 228, 210) in pixels
+    assert (255, 255, 255) not in pixels
+
+
+@pytest.mark.parametrize("scene", ["red", "green", "black"])
+def test_detect_color_from_in_memory_image(color_scenes, scene):
+    res = cd.detect_color_from_image_source(color_scenes[scene])
+    assert res is not None
+    assert res.color == scene
+
+
+@pytest.mark.parametrize(
+    "rgb, expected",
+    [((200, 30, 30), "red"), ((40, 160, 60), "green"), ((15, 15, 15), "black"), ((210, 190, 160), "beige")],
+)
+def test_large_photo_downscale_keeps_detected_color(rgb, expected):
+    # 12MP JPEG-compressed product shot with a contrasting stripe, so resampling actually matters
+    img = Image.new("RGB", (3000, 4000), (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((600, 900, 2400, 3100), fill=rgb)
+    draw.rectangle((1300, 1500, 1700, 2500), fill=(min(255, rgb[0] + 40), rgb[1], rgb[2]))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    photo = Image.open(io.BytesIO(buf.getvalue())).convert("RGB")
+
+    # plain bicubic resize straight to the analysis grid (no reducing_gap), as before
+    plain = photo.resize((cd.ANALYSIS_SIZE, cd.ANALYSIS_SIZE))
+    reduced = photo.resize((cd.ANALYSIS_SIZE, cd.ANALYSIS_SIZE), reducing_gap=3.0)
+    assert max(hi for _, hi in ImageChops.difference(reduced, plain).getextrema()) <= 4
+
+    res = cd.detect_color_from_image_source(photo)
+    assert res is not None
+    assert res.color == cd.detect_color_from_image_source(plain).color == expected